@@ -8,7 +8,7 @@ It translates between Bedrock agent requests and our existing MCP endpoints.
 import json
 import os
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, NamedTuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -57,28 +57,45 @@ except ImportError:
     def handle_transaction_status(event):
         return {"success": True, "status": "pending"}
 
+def _store_session_wallet(session_id, wallet_address, user_id=None):
+    """
+    Store the wallet address in the session before the response is returned
+    
+    Args:
+        session_id: The Bedrock agent session ID
+        wallet_address: Ethereum wallet address
+        user_id: Optional user identifier
+        
+    Returns:
+        bool: True if the session was updated, False otherwise
+    """
+    stored = store_wallet_address(session_id, wallet_address, user_id)
+    if stored:
+        logger.info(f"Stored wallet address {wallet_address} in session {session_id}")
+    else:
+        logger.warning(f"Could not store wallet address {wallet_address} in session {session_id}")
+    return stored
+
+# Parameter values Bedrock sends for boolean flags
+_TRUTHY = frozenset({"true", "True", "TRUE", "1", "yes", True})
+
 # Try to import AWS MCP server components
 try:
     from aws_mcp_server import app as mcp_app
 except ImportError as e:
     logger.warning(f"Could not import MCP server app: {e}")
 
-# Bedrock agent action group mapping
-ACTION_GROUP_MAP = {
-    "NFTPaymentActions": {
-        "wallet_login": lambda params: wallet_login_with_session(params),
-        "get_wallet_info": lambda params: get_wallet_info_with_session(params),
-        "get_wallet_nfts": lambda params: get_wallet_nfts_with_session(params),
-        "process_payment": lambda params: process_payment_with_session(params),
-        "check_transaction": lambda params: handle_transaction_status({
-            "queryStringParameters": {
-                "transaction_id": params.get("transaction_id")
-            }
-        })
-    }
-}
+class ParsedRequest(NamedTuple):
+    """Parsed Bedrock agent request"""
+    action_group: str
+    operation: str
+    parameters: Dict[str, Any]
+    body: Dict[str, Any]
+    type: str
+    token: str = ""
+    error: str = ""
 
-def parse_bedrock_request(event: Dict[str, Any]) -> Dict[str, Any]:
+def parse_bedrock_request(event: Dict[str, Any]) -> ParsedRequest:
     """
     Parse the AWS Bedrock agent request
     
@@ -86,27 +103,27 @@ def parse_bedrock_request(event: Dict[str, Any]) -> Dict[str, Any]:
         event: The Lambda event from Bedrock agent
         
     Returns:
-        Dict containing the parsed request information
+        ParsedRequest containing the parsed request information
     """
-    logger.info(f"Received Bedrock agent request: {json.dumps(event)}")
-    
     try:
         # Extract action group and API details
         request_body = event.get("requestBody", {})
         api_path = request_body.get("apiPath", "")
         action_group = request_body.get("actionGroup", "")
+        # Log routing metadata only, the payload carries wallet and session data
+        logger.info("Received Bedrock agent request: %s %s", action_group, api_path)
         parameters = {}
         
         # Extract session information
         session_id = event.get("sessionId")
         if session_id:
-            logger.info(f"Found session ID in request: {session_id}")
+            logger.debug("Found session ID in request: %s", session_id)
             parameters["session_id"] = session_id
             
         # Extract user ID if available (for multi-user scenarios)
         user_id = event.get("userId")
         if user_id:
-            logger.info(f"Found user ID in request: {user_id}")
+            logger.debug("Found user ID in request: %s", user_id)
             parameters["user_id"] = user_id
             
         # Extract parameters
@@ -137,28 +154,32 @@ def parse_bedrock_request(event: Dict[str, Any]) -> Dict[str, Any]:
         
         # Special case handling for webhook validation
         if "rawPath" in event and event.get("rawPath", "") == "/validate":
-            return {
-                "type": "validation",
-                "token": event.get("headers", {}).get("x-amzn-bedrock-validation-token", "")
-            }
+            return ParsedRequest(
+                action_group="",
+                operation="",
+                parameters={},
+                body={},
+                type="validation",
+                token=event.get("headers", {}).get("x-amzn-bedrock-validation-token", "")
+            )
         
-        return {
-            "action_group": action_group,
-            "operation": operation,
-            "parameters": parameters,
-            "body": body,
-            "type": "invocation"
-        }
+        return ParsedRequest(
+            action_group=action_group,
+            operation=operation,
+            parameters=parameters,
+            body=body,
+            type="invocation"
+        )
     except Exception as e:
         logger.error(f"Error parsing Bedrock request: {e}")
-        return {
-            "action_group": "",
-            "operation": "",
-            "parameters": {},
-            "body": {},
-            "type": "error",
-            "error": str(e)
-        }
+        return ParsedRequest(
+            action_group="",
+            operation="",
+            parameters={},
+            body={},
+            type="error",
+            error=str(e)
+        )
 
 def format_bedrock_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -173,6 +194,8 @@ def format_bedrock_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
     if not response_data:
         response_data = {"error": "No response data"}
     
+    response_body = json.dumps(response_data)
+    
     # Format for Bedrock agent
     bedrock_response = {
         "messageVersion": "1.0",
@@ -182,12 +205,12 @@ def format_bedrock_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
             "httpMethod": "POST",
             "httpStatusCode": 200,
             "responseBody": {
-                "application/json": json.dumps(response_data)
+                "application/json": response_body
             }
         }
     }
     
-    logger.info(f"Sending response to Bedrock: {json.dumps(bedrock_response)}")
+    logger.info("Sending response to Bedrock: %d bytes", len(response_body))
     return bedrock_response
 
 def validate_webhook(token: str) -> Dict[str, Any]:
@@ -225,16 +248,20 @@ def handle_bedrock_request(event: Dict[str, Any]) -> Dict[str, Any]:
     parsed_request = parse_bedrock_request(event)
     
     # Handle webhook validation
-    if parsed_request.get("type") == "validation":
-        return validate_webhook(parsed_request.get("token", ""))
+    if parsed_request.type == "validation":
+        return validate_webhook(parsed_request.token)
+    
+    if parsed_request.error:
+        return format_bedrock_response({
+            "error": f"Invalid Bedrock request: {parsed_request.error}"
+        })
     
-    action_group = parsed_request.get("action_group")
-    operation = parsed_request.get("operation")
-    parameters = parsed_request.get("parameters")
+    action_group = parsed_request.action_group
+    operation = parsed_request.operation
+    parameters = parsed_request.parameters
     
-    # Log request details
-    logger.info(f"Processing request: {action_group}.{operation}")
-    logger.info(f"Parameters: {parameters}")
+    # Log request details (parameter names only, values may be long addresses)
+    logger.info("Processing request: %s.%s params=%s", action_group, operation, list(parameters))
     
     try:
         # Look up the handler function
@@ -243,7 +270,6 @@ def handle_bedrock_request(event: Dict[str, Any]) -> Dict[str, Any]:
             
             # Call the handler
             result = handler_func(parameters)
-            logger.info(f"Handler result: {result}")
             
             # Format and return the response
             return format_bedrock_response(result)
@@ -253,7 +279,7 @@ def handle_bedrock_request(event: Dict[str, Any]) -> Dict[str, Any]:
                 "error": f"Operation {action_group}.{operation} not supported"
             })
     except Exception as e:
-        logger.error(f"Error handling Bedrock request: {e}")
+        logger.error("Error handling Bedrock request %s.%s: %s", action_group, operation, e)
         return format_bedrock_response({
             "error": str(e)
         })
@@ -288,15 +314,15 @@ def lambda_handler(event, context):
     from bedrock_agent_connector import process_agent_request
     return process_agent_request(event)
 
-def wallet_login_with_session(params):
+def _resolve_wallet_address(params):
     """
-    Handle wallet login with session persistence
+    Resolve the wallet address for a request, falling back to the session store
     
     Args:
         params: Parameters from Bedrock agent
         
     Returns:
-        dict: Login result with session info
+        tuple: (wallet_address, session_id, user_id)
     """
     wallet_address = params.get("wallet_address")
     session_id = params.get("session_id")
@@ -309,8 +335,22 @@ def wallet_login_with_session(params):
             wallet_address = stored_address
             logger.info(f"Retrieved wallet address {wallet_address} from session {session_id}")
             
+    return wallet_address, session_id, user_id
+
+def wallet_login_with_session(params):
+    """
+    Handle wallet login with session persistence
+    
+    Args:
+        params: Parameters from Bedrock agent
+        
+    Returns:
+        dict: Login result with session info
+    """
+    wallet_address, session_id, user_id = _resolve_wallet_address(params)
+    
     # Check if this is a connect request or a query about connection status
-    is_connect_request = params.get("connect", "false").lower() == "true"
+    is_connect_request = params.get("connect") in _TRUTHY
     
     # If we still don't have a wallet address
     if not wallet_address:
@@ -334,8 +374,7 @@ def wallet_login_with_session(params):
     
     # If login successful, store wallet address in session
     if result.get("success") and session_id:
-        store_wallet_address(session_id, wallet_address, user_id)
-        logger.info(f"Stored wallet address {wallet_address} in session {session_id}")
+        result["session_saved"] = _store_session_wallet(session_id, wallet_address, user_id)
         result["connected"] = True
         result["wallet_address"] = wallet_address
         
@@ -351,18 +390,9 @@ def get_wallet_info_with_session(params):
     Returns:
         dict: Wallet information
     """
-    wallet_address = params.get("wallet_address")
-    session_id = params.get("session_id")
-    user_id = params.get("user_id")
-    is_required = params.get("is_required", "false").lower() == "true"
+    wallet_address, session_id, user_id = _resolve_wallet_address(params)
+    is_required = params.get("is_required") in _TRUTHY
     
-    # If we have a session ID but no wallet address, try to retrieve it
-    if session_id and not wallet_address:
-        stored_address = get_wallet_address(session_id, user_id)
-        if stored_address:
-            wallet_address = stored_address
-            logger.info(f"Retrieved wallet address {wallet_address} from session {session_id}")
-            
     # If we still don't have a wallet address and it's required for this operation
     if not wallet_address:
         if is_required:
@@ -396,18 +426,9 @@ def get_wallet_nfts_with_session(params):
     Returns:
         dict: NFTs owned by the wallet
     """
-    wallet_address = params.get("wallet_address")
-    session_id = params.get("session_id")
-    user_id = params.get("user_id")
-    is_required = params.get("is_required", "false").lower() == "true"
+    wallet_address, session_id, user_id = _resolve_wallet_address(params)
+    is_required = params.get("is_required") in _TRUTHY
     
-    # If we have a session ID but no wallet address, try to retrieve it
-    if session_id and not wallet_address:
-        stored_address = get_wallet_address(session_id, user_id)
-        if stored_address:
-            wallet_address = stored_address
-            logger.info(f"Retrieved wallet address {wallet_address} from session {session_id}")
-            
     # If we still don't have a wallet address
     if not wallet_address:
         if is_required:
@@ -442,17 +463,8 @@ def process_payment_with_session(params):
     Returns:
         dict: Payment processing result
     """
-    wallet_address = params.get("wallet_address")
-    session_id = params.get("session_id")
-    user_id = params.get("user_id")
+    wallet_address, session_id, user_id = _resolve_wallet_address(params)
     
-    # If we have a session ID but no wallet address, try to retrieve it
-    if session_id and not wallet_address:
-        stored_address = get_wallet_address(session_id, user_id)
-        if stored_address:
-            wallet_address = stored_address
-            logger.info(f"Retrieved wallet address {wallet_address} from session {session_id}")
-            
     # If we still don't have a wallet address, return error
     # Payments always require wallet address
     if not wallet_address:
@@ -482,6 +494,33 @@ def process_payment_with_session(params):
     
     # If payment is successful, ensure we store the wallet address for future use
     if result.get("success") and session_id:
-        store_wallet_address(session_id, wallet_address, user_id)
+        result["session_saved"] = _store_session_wallet(session_id, wallet_address, user_id)
         
     return result
+
+def check_transaction(params):
+    """
+    Check transaction status
+    
+    Args:
+        params: Parameters from Bedrock agent
+        
+    Returns:
+        dict: Transaction status
+    """
+    return handle_transaction_status({
+        "queryStringParameters": {
+            "transaction_id": params.get("transaction_id")
+        }
+    })
+
+# Bedrock agent action group mapping
+ACTION_GROUP_MAP = {
+    "NFTPaymentActions": {
+        "wallet_login": wallet_login_with_session,
+        "get_wallet_info": get_wallet_info_with_session,
+        "get_wallet_nfts": get_wallet_nfts_with_session,
+        "process_payment": process_payment_with_session,
+        "check_transaction": check_transaction
+    }
+}
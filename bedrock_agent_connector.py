@@ -9,17 +9,95 @@ import json
 import boto3
 import uuid
 import time
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import logging
 import os
+import threading
+from functools import lru_cache
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; the Lambda runtime installs the root handler
 logger = logging.getLogger("bedrock_agent_connector")
+logger.setLevel(logging.INFO)
+
+# Prefer orjson for the hot JSON encode/decode path
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+    
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
 
 # Default agent ID and region from configuration file or environment
 DEFAULT_AGENT_ID = os.environ.get('BEDROCK_AGENT_ID', "LRKVLMX55I")  # AgoraAI_BASEMain
 DEFAULT_REGION = os.environ.get('BEDROCK_REGION', "ap-south-1")
+DEFAULT_AGENT_NAME = "AgoraAI_BASEMain"
+
+def _allowed(env_var, default):
+    """Read a comma-separated allow-list from the environment"""
+    return frozenset(v.strip() for v in os.environ.get(env_var, default).split(',') if v.strip())
+
+# Regions and agents a request may select. Connectors are cached per
+# (region, agent), so unchecked values from clients could churn the cache and
+# force client setup and alias discovery on every request
+ALLOWED_REGIONS = _allowed('BEDROCK_ALLOWED_REGIONS', DEFAULT_REGION)
+ALLOWED_AGENT_IDS = _allowed('BEDROCK_ALLOWED_AGENT_IDS', DEFAULT_AGENT_ID)
+
+# Opt-in: warm each connector's Bedrock connection when it is first created.
+# Never done at import, so imports and credential-less cold starts stay offline
+WARMUP_CONNECTORS = os.environ.get('BEDROCK_CONNECTOR_WARMUP', '').lower() in ('1', 'true', 'yes')
+
+# Static response headers shared by every API Gateway response
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization"
+}
+CORS_JSON_HEADERS = {**CORS_HEADERS, "Content-Type": "application/json"}
+
+# Shared client configuration: keep connections alive between invocations
+# and allow enough pooled connections for concurrent agent calls
+BOTO_CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    connect_timeout=2,
+    read_timeout=60,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+def _agent_response(message, agent_name, session_id, agent_id, alias_id, request_id):
+    """
+    Build a successful agent response
+    
+    Args:
+        message: The agent's reply text
+        agent_name: Agent name for response metadata
+        session_id: Session ID for conversation tracking
+        agent_id: The ID of the Bedrock agent
+        alias_id: The agent alias ID used for the call
+        request_id: Request ID for tracking
+        
+    Returns:
+        dict: The agent's response
+    """
+    return {
+        "success": True,
+        "data": {
+            "message": message,
+            "agentName": agent_name,
+            "sessionId": session_id
+        },
+        "metadata": {
+            "agentId": agent_id,
+            "aliasId": alias_id,
+            "timestamp": int(time.time() * 1000),
+            "requestId": request_id
+        }
+    }
 
 class BedrockAgentConnector:
     """
@@ -46,15 +124,21 @@ class BedrockAgentConnector:
         
         # Initialize AWS clients
         try:
-            self.agent_mgmt = boto3.client('bedrock-agent', region_name=self.region_name)
-            self.agent_runtime = boto3.client('bedrock-agent-runtime', region_name=self.region_name)
+            self.agent_mgmt = boto3.client('bedrock-agent', region_name=self.region_name, config=BOTO_CLIENT_CONFIG)
+            self.agent_runtime = boto3.client('bedrock-agent-runtime', region_name=self.region_name, config=BOTO_CLIENT_CONFIG)
         except Exception as e:
-            logger.warning(f"Error initializing Bedrock clients (normal in test environment): {str(e)}")
+            logger.warning("Error initializing Bedrock clients (normal in test environment): %s", e)
             self.agent_mgmt = None
             self.agent_runtime = None
         
         # Cache for alias ID
         self.alias_id = None
+        self._alias_lock = threading.Lock()
+        
+        # In test mode, bind the mock paths once instead of checking per call
+        if self.agent_runtime is None or self.agent_mgmt is None:
+            self.alias_id = "test-alias-id"
+            self.invoke_agent = self._invoke_agent_mock
     
     def get_agent_alias(self):
         """
@@ -63,84 +147,129 @@ class BedrockAgentConnector:
         Returns:
             str: The agent alias ID
         """
-        # In test mode, return a dummy alias ID
-        if self.agent_runtime is None or self.agent_mgmt is None:
-            return "test-alias-id"
-            
         if self.alias_id:
             return self.alias_id
             
+        with self._alias_lock:
+            # Another invocation may have resolved the alias while we waited
+            if not self.alias_id:
+                self.alias_id = self._resolve_agent_alias()
+            return self.alias_id
+    
+    def _resolve_agent_alias(self):
+        """
+        Look up or create the agent alias ID
+        
+        Returns:
+            str: The agent alias ID
+        """
+        # A configured alias skips discovery on every cold start
+        configured_alias = os.environ.get('BEDROCK_AGENT_ALIAS_ID')
+        if configured_alias:
+            return configured_alias
+            
         try:
             # Try to find an existing prepared alias
             aliases = self.agent_mgmt.list_agent_aliases(agentId=self.agent_id).get("agentAliasSummaries", [])
             for alias in aliases:
                 if alias["agentAliasStatus"] == "PREPARED":
-                    self.alias_id = alias["agentAliasId"]
-                    logger.info(f"Found existing alias: {self.alias_id}")
-                    return self.alias_id
+                    alias_id = alias["agentAliasId"]
+                    logger.info("Found existing alias %s; set BEDROCK_AGENT_ALIAS_ID to skip alias discovery", alias_id)
+                    return alias_id
             
             # If no suitable alias found, create a new one
-            logger.info(f"Creating new agent alias '{self.alias_name}'")
+            logger.info("Creating new agent alias '%s'", self.alias_name)
             new_alias = self.agent_mgmt.create_agent_alias(
                 agentId=self.agent_id,
                 agentAliasName=self.alias_name,
                 routingConfiguration=[{"agentVersion": "1"}]
             )
-            self.alias_id = new_alias["agentAlias"]["agentAliasId"]
+            alias_id = new_alias["agentAlias"]["agentAliasId"]
+            logger.info("Created alias %s; set BEDROCK_AGENT_ALIAS_ID to skip alias discovery", alias_id)
             
-            # Wait for alias to propagate
+            # Wait for newly created alias to propagate
             time.sleep(2)
-            return self.alias_id
+            return alias_id
             
         except Exception as e:
-            logger.error(f"Error getting agent alias: {str(e)}")
+            logger.error("Error getting agent alias: %s", e)
             raise
     
-    def invoke_agent(self, user_input, session_id=None, request_id=None, agent_name=None):
+    def warmup(self):
         """
-        Invoke the Bedrock agent with user input
+        Pre-establish the Bedrock connection before the first invocation
+        
+        Makes a read-only get_agent call, which resolves credentials and opens
+        a keep-alive HTTPS connection to the agent endpoint used for alias
+        discovery, so the first request doesn't pay for them. Alias discovery
+        itself is left to the first invocation, since it may create an alias
+        and wait for it to propagate.
+        
+        Returns:
+            bool: True if warmup succeeded, False otherwise
+        """
+        if self.agent_mgmt is None or not self.agent_id:
+            return False
+            
+        try:
+            self.agent_mgmt.get_agent(agentId=self.agent_id)
+            return True
+        except Exception as e:
+            logger.warning("Bedrock connector warmup failed: %s", e)
+            return False
+    
+    def _invoke_agent_mock(self, user_input, session_id=None, request_id=None, agent_name=DEFAULT_AGENT_NAME):
+        """
+        Return a mock agent response when no Bedrock client is available
         
         Args:
             user_input: The user's message
             session_id: Optional session ID for conversation tracking
             request_id: Optional request ID for tracking
-            agent_name: Optional agent name for response metadata
+            agent_name: Agent name for response metadata
             
         Returns:
-            dict: The agent's response
+            dict: The mock agent response
         """
         if not session_id:
-            session_id = str(uuid.uuid4())
-            
+            session_id = uuid.uuid4().hex
         if not request_id:
-            request_id = str(uuid.uuid4())
-            
-        if not agent_name:
-            agent_name = "AgoraAI_BASEMain"
+            request_id = uuid.uuid4().hex
             
         if not self.agent_id:
             return {
                 "success": False,
                 "error": "No Bedrock Agent ID configured"
             }
+            
+        logger.info("Using mock response for testing")
+        return _agent_response(
+            f"This is a mock response to: '{user_input}'. In a real environment, this would come from AWS Bedrock Agent.",
+            agent_name, session_id, self.agent_id, "test-alias-id", request_id
+        )
+    
+    def invoke_agent(self, user_input, session_id=None, request_id=None, agent_name=DEFAULT_AGENT_NAME):
+        """
+        Invoke the Bedrock agent with user input
         
-        # For testing purposes, if agent_runtime is None, return a mock response
-        if self.agent_runtime is None:
-            # Mock response for testing
-            logger.info("Using mock response for testing")
+        Args:
+            user_input: The user's message
+            session_id: Optional session ID for conversation tracking
+            request_id: Optional request ID for tracking
+            agent_name: Agent name for response metadata
+            
+        Returns:
+            dict: The agent's response
+        """
+        if not session_id:
+            session_id = uuid.uuid4().hex
+        if not request_id:
+            request_id = uuid.uuid4().hex
+            
+        if not self.agent_id:
             return {
-                "success": True,
-                "data": {
-                    "message": f"This is a mock response to: '{user_input}'. In a real environment, this would come from AWS Bedrock Agent.",
-                    "agentName": agent_name,
-                    "sessionId": session_id
-                },
-                "metadata": {
-                    "agentId": self.agent_id,
-                    "aliasId": "test-alias-id",
-                    "timestamp": str(uuid.uuid4()),
-                    "requestId": request_id
-                }
+                "success": False,
+                "error": "No Bedrock Agent ID configured"
             }
             
         try:
@@ -155,29 +284,17 @@ class BedrockAgentConnector:
                 inputText=user_input
             )
             
-            # Parse response chunks
-            output_text = ""
+            # Parse response chunks, joining the raw bytes once at the end
+            parts = []
             for chunk_event in response.get("completion", []):
                 if "chunk" in chunk_event and "bytes" in chunk_event["chunk"]:
-                    output_text += chunk_event["chunk"]["bytes"].decode("utf-8")
+                    parts.append(chunk_event["chunk"]["bytes"])
+            output_text = b"".join(parts).decode("utf-8")
               
-            return {
-                "success": True,
-                "data": {
-                    "message": output_text.strip(),
-                    "agentName": agent_name,
-                    "sessionId": session_id
-                },
-                "metadata": {
-                    "agentId": self.agent_id,
-                    "aliasId": alias_id,
-                    "timestamp": str(uuid.uuid4()),
-                    "requestId": request_id
-                }
-            }
+            return _agent_response(output_text.strip(), agent_name, session_id, self.agent_id, alias_id, request_id)
             
         except ClientError as e:
-            logger.error(f"Bedrock agent client error: {str(e)}")
+            logger.error("Bedrock agent client error: %s", e)
             return {
                 "success": False,
                 "error": {
@@ -186,7 +303,7 @@ class BedrockAgentConnector:
                 }
             }
         except Exception as e:
-            logger.error(f"Bedrock agent error: {str(e)}")
+            logger.error("Bedrock agent error: %s", e)
             return {
                 "success": False,
                 "error": {
@@ -194,9 +311,27 @@ class BedrockAgentConnector:
                     "message": str(e)
                 }
             }
-            
-# Singleton instance for reuse
-_connector_instance = None
+
+# Connectors are cached per (region, agent) so each boto3 client pair is
+# only built once per execution environment
+_connector_lock = threading.Lock()
+
+@lru_cache(maxsize=8)
+def _create_connector(region_name, agent_id):
+    """
+    Create a BedrockAgentConnector for a region and agent
+    
+    Args:
+        region_name: AWS region for Bedrock Agent
+        agent_id: Bedrock Agent ID
+        
+    Returns:
+        BedrockAgentConnector: A new connector instance
+    """
+    connector = BedrockAgentConnector(region_name=region_name, agent_id=agent_id)
+    if WARMUP_CONNECTORS:
+        connector.warmup()
+    return connector
 
 def get_connector(region_name=None, agent_id=None):
     """
@@ -209,20 +344,30 @@ def get_connector(region_name=None, agent_id=None):
     Returns:
         BedrockAgentConnector: An instance of the connector
     """
-    global _connector_instance
+    # Normalize defaults so equivalent requests share a cache entry
+    region_name = region_name or DEFAULT_REGION
+    agent_id = agent_id or DEFAULT_AGENT_ID
     
-    if _connector_instance is None:
-        # Get region from environment if not provided
-        if not region_name:
-            import os
-            region_name = os.environ.get('BEDROCK_REGION', 'ap-south-1')
-            
-        _connector_instance = BedrockAgentConnector(
-            region_name=region_name,
-            agent_id=agent_id
-        )
+    if region_name not in ALLOWED_REGIONS or agent_id not in ALLOWED_AGENT_IDS:
+        raise ValueError(f"Bedrock agent {agent_id} in {region_name} is not configured")
     
-    return _connector_instance
+    with _connector_lock:
+        return _create_connector(region_name, agent_id)
+
+def _pick(body, event, key, default=None):
+    """
+    Read a request field from the body, falling back to the event
+    
+    Args:
+        body: Parsed request body
+        event: Lambda event
+        key: Field name
+        default: Value to use when neither source has the field
+        
+    Returns:
+        The first non-empty value found, or the default
+    """
+    return body.get(key) or event.get(key) or default
 
 def process_agent_request(event):
     """
@@ -239,24 +384,25 @@ def process_agent_request(event):
         body = event.get("body", {})
         if isinstance(body, str):
             try:
-                body = json.loads(body)
+                body = _loads(body)
             except json.JSONDecodeError:
                 return {
                     "statusCode": 400,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type,Authorization"
-                    },
-                    "body": json.dumps({"success": False, "error": {"message": "Invalid JSON"}})
+                    "headers": CORS_HEADERS,
+                    "body": _dumps({"success": False, "error": {"message": "Invalid JSON"}})
                 }
         
         # Extract the user input message
         user_input = None
         session_id = None
         
-        if "messages" in body and isinstance(body["messages"], list):
-            for message in reversed(body["messages"]):
+        messages = body.get("messages") or ()
+        if isinstance(messages, list):
+            # Scan backwards from the newest turn; clients that set
+            # latestMessageOnly only need the last message checked
+            stop = max(len(messages) - 2, -1) if body.get("latestMessageOnly") else -1
+            for i in range(len(messages) - 1, stop, -1):
+                message = messages[i]
                 if message.get("role", "") == "user" and message.get("content"):
                     user_input = message["content"]
                     break
@@ -265,20 +411,28 @@ def process_agent_request(event):
             user_input = body.get("message") or body.get("input") or body.get("query") or "Hello!"
         
         # Check for session ID - Important for persistent storage
-        session_id = body.get("sessionId") or event.get("sessionId") or str(uuid.uuid4())
-        logger.info(f"Using session ID: {session_id}")
+        session_id = _pick(body, event, "sessionId") or uuid.uuid4().hex
+        logger.info("Using session ID: %s", session_id)
         
         # Get agent ID from request or environment
-        agent_id = body.get("agentId") or event.get("agentId") or DEFAULT_AGENT_ID
+        agent_id = _pick(body, event, "agentId", DEFAULT_AGENT_ID)
         
         # Get region from request or default
-        region_name = body.get("region") or event.get("region") or DEFAULT_REGION
+        region_name = _pick(body, event, "region", DEFAULT_REGION)
         
         # Get request ID for tracking
-        request_id = body.get("requestId") or event.get("requestId") or str(uuid.uuid4())
+        request_id = _pick(body, event, "requestId") or uuid.uuid4().hex
         
         # Get agent name if provided
-        agent_name = body.get("agentName") or event.get("agentName") or "AgoraAI_BASEMain"
+        agent_name = _pick(body, event, "agentName", DEFAULT_AGENT_NAME)
+        
+        # Only configured agents and regions may be selected by the request
+        if region_name not in ALLOWED_REGIONS or agent_id not in ALLOWED_AGENT_IDS:
+            return {
+                "statusCode": 400,
+                "headers": CORS_HEADERS,
+                "body": _dumps({"success": False, "error": {"message": "Unsupported agentId or region"}})
+            }
         
         # Get connector and invoke agent
         connector = get_connector(region_name, agent_id)
@@ -287,13 +441,8 @@ def process_agent_request(event):
         if result["success"]:
             return {
                 "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                    "Content-Type": "application/json"
-                },
-                "body": json.dumps({
+                "headers": CORS_JSON_HEADERS,
+                "body": _dumps({
                     "success": True,
                     "data": result["data"],
                     "metadata": result["metadata"]
@@ -302,27 +451,19 @@ def process_agent_request(event):
         else:
             return {
                 "statusCode": 500,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type,Authorization"
-                },
-                "body": json.dumps({
+                "headers": CORS_HEADERS,
+                "body": _dumps({
                     "success": False,
                     "error": result.get("error", {"message": "Unknown error"})
                 })
             }
               
     except ClientError as e:
-        logger.error(f"Bedrock agent client error: {str(e)}")
+        logger.error("Bedrock agent client error: %s", e)
         return {
             "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization"
-            },
-            "body": json.dumps({
+            "headers": CORS_HEADERS,
+            "body": _dumps({
                 "success": False,
                 "error": {
                     "type": e.response["Error"]["Code"],
@@ -331,15 +472,11 @@ def process_agent_request(event):
             })
         }
     except Exception as e:
-        logger.error(f"Error processing agent request: {str(e)}")
+        logger.error("Error processing agent request: %s", e)
         return {
             "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization"
-            },
-            "body": json.dumps({
+            "headers": CORS_HEADERS,
+            "body": _dumps({
                 "success": False,
                 "error": {
                     "type": "InternalError",
@@ -8,31 +8,76 @@ and persistent wallet sessions for a complete NFT management system.
 import json
 import os
 import uuid
+import time
 import base64
 import logging
+import threading
 from typing import Dict, Any, Optional, List, Tuple
 import boto3
+from botocore.config import Config
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; the Lambda runtime installs the root handler
 logger = logging.getLogger("bedrock_integration")
+logger.setLevel(logging.INFO)
+
+# Prefer orjson for the hot JSON encode/decode path
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+    
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
+# Static response headers shared by every API Gateway response
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+WALLET_CORS_HEADERS = {**CORS_HEADERS, 'Access-Control-Allow-Headers': 'Content-Type,x-session-id'}
+
+def _get_header(event, name):
+    """
+    Get a request header regardless of the casing API Gateway delivered
+    
+    Args:
+        event: The API Gateway event
+        name: Lowercase header name
+        
+    Returns:
+        str: Header value, or None if not present
+    """
+    headers = event.get('headers') or {}
+    return headers.get(name) or headers.get(name.title())
+
+def _get_session_id(event):
+    """
+    Get the session ID from the headers or query string
+    
+    Args:
+        event: The API Gateway event
+        
+    Returns:
+        str: Session ID, or None if not provided
+    """
+    session_id = _get_header(event, 'x-session-id')
+    if not session_id:
+        query_params = event.get('queryStringParameters') or {}
+        session_id = query_params.get('session_id')
+    return session_id
 
 # Import session manager for persistent wallet storage
 try:
-    from session_manager import get_user_data, store_user_data, get_wallet_address, store_wallet_address
+    from session_manager import get_wallet_address, store_wallet_address, append_user_data_list
 except ImportError:
     logger.warning("Could not import session_manager module, using mocks")
     # Simple in-memory storage for testing
     _session_data = {}
     _wallet_data = {}
     
-    def get_user_data(session_id, user_id=None):
+    def append_user_data_list(session_id, field, item, user_id=None):
         key = f"{session_id}:{user_id}" if user_id else session_id
-        return _session_data.get(key, {})
-    
-    def store_user_data(session_id, data, user_id=None):
-        key = f"{session_id}:{user_id}" if user_id else session_id
-        _session_data[key] = data
+        _session_data.setdefault(key, {}).setdefault(field, []).append(item)
         return True
         
     def get_wallet_address(session_id, user_id=None):
@@ -86,20 +131,17 @@ except ImportError:
     # Mock wallet functions
     def handle_wallet_connection(event):
         try:
-            body = json.loads(event.get('body', '{}'))
+            body = _loads(event.get('body', '{}'))
             wallet_address = body.get('wallet_address', '')
-            session_id = event.get('headers', {}).get('x-session-id', str(uuid.uuid4()))
+            session_id = _get_header(event, 'x-session-id') or str(uuid.uuid4())
             
             # Store wallet in session
             store_wallet_address(session_id, wallet_address)
             
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type,x-session-id'
-                },
-                'body': json.dumps({
+                'headers': WALLET_CORS_HEADERS,
+                'body': _dumps({
                     'success': True,
                     'session_id': session_id,
                     'wallet_address': wallet_address,
@@ -109,18 +151,18 @@ except ImportError:
         except Exception as e:
             return {
                 'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': False, 'error': str(e)})
+                'headers': CORS_HEADERS,
+                'body': _dumps({'success': False, 'error': str(e)})
             }
     
     def check_wallet_status(event):
-        session_id = event.get('headers', {}).get('x-session-id', '')
+        session_id = _get_header(event, 'x-session-id') or ''
         wallet_address = get_wallet_address(session_id)
         
         return {
             'statusCode': 200,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+            'headers': CORS_HEADERS,
+            'body': _dumps({
                 'success': True,
                 'connected': bool(wallet_address),
                 'wallet_address': wallet_address
@@ -128,23 +170,72 @@ except ImportError:
         }
     
     def disconnect_wallet(event):
-        session_id = event.get('headers', {}).get('x-session-id', '')
+        session_id = _get_header(event, 'x-session-id') or ''
         store_wallet_address(session_id, None)
         
         return {
             'statusCode': 200,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+            'headers': CORS_HEADERS,
+            'body': _dumps({
                 'success': True,
                 'message': 'Wallet disconnected'
             })
         }
 
+# Cache for NFT image lookups; minted image URLs rarely change
+_nft_image_cache = {}
+_nft_image_cache_lock = threading.Lock()
+NFT_IMAGE_CACHE_EXPIRY = 600  # 10 minutes
+NFT_IMAGE_CACHE_MAX_SIZE = 1024
+
+def get_nft_images_cached(contract_address, token_ids=None):
+    """
+    Get NFT images, reusing recent results for the same contract and tokens
+    
+    Args:
+        contract_address: The NFT contract address
+        token_ids: Optional list of token IDs
+        
+    Returns:
+        dict: NFT image lookup result
+    """
+    # Normalize so equivalent queries share a cache entry
+    key = (contract_address.lower(), tuple(sorted(token_ids)) if token_ids else None)
+    now = time.time()
+    
+    with _nft_image_cache_lock:
+        cached_item = _nft_image_cache.get(key)
+        if cached_item and now - cached_item['timestamp'] < NFT_IMAGE_CACHE_EXPIRY:
+            return cached_item['data']
+    
+    result = get_nft_images(contract_address, token_ids)
+    
+    if result.get('success'):
+        with _nft_image_cache_lock:
+            if len(_nft_image_cache) >= NFT_IMAGE_CACHE_MAX_SIZE:
+                # Evict the oldest entry
+                _nft_image_cache.pop(next(iter(_nft_image_cache)))
+            _nft_image_cache[key] = {
+                'data': result,
+                'timestamp': now
+            }
+    
+    return result
+
+# Keep S3 connections alive across warm Lambda invocations
+S3_CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    connect_timeout=2,
+    read_timeout=60,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
 # Initialize AWS clients if needed
 try:
-    s3_client = boto3.client('s3', region_name=os.environ.get('AWS_REGION', 'ap-south-1'))
+    s3_client = boto3.client('s3', region_name=os.environ.get('AWS_REGION', 'ap-south-1'), config=S3_CLIENT_CONFIG)
 except Exception as e:
-    logger.warning(f"Error initializing S3 client: {e}")
+    logger.warning("Error initializing S3 client: %s", e)
     s3_client = None
 
 # S3 bucket configuration
@@ -161,54 +252,39 @@ def handle_image_upload_request(event: Dict[str, Any]) -> Dict[str, Any]:
         API Gateway response
     """
     try:
-        # Extract session ID from headers or query parameters
-        session_id = event.get('headers', {}).get('x-session-id', None)
-        if not session_id and 'queryStringParameters' in event and event['queryStringParameters']:
-            session_id = event['queryStringParameters'].get('session_id')
-        
-        # Default to a new UUID if no session ID is provided
-        if not session_id:
-            session_id = str(uuid.uuid4())
+        # Extract session ID from headers or query parameters,
+        # defaulting to a new UUID if no session ID is provided
+        session_id = _get_session_id(event) or str(uuid.uuid4())
         
         # Extract user ID if available
-        user_id = None
-        if 'queryStringParameters' in event and event['queryStringParameters']:
-            user_id = event['queryStringParameters'].get('user_id')
+        user_id = (event.get('queryStringParameters') or {}).get('user_id')
         
         # Parse the request body
-        body = json.loads(event.get('body', '{}'))
+        body = _loads(event.get('body', '{}'))
         image_data = body.get('image', '')
         
         if not image_data:
             return {
                 'statusCode': 400,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': False, 'error': 'No image data provided'})
+                'headers': CORS_HEADERS,
+                'body': _dumps({'success': False, 'error': 'No image data provided'})
             }
         
         # Process the image
         result = process_image_upload(image_data, session_id, user_id)
         
-        # Store image reference in session data
-        session_data = get_user_data(session_id, user_id) or {}
-        if 'images' not in session_data:
-            session_data['images'] = []
-        
         # Add this image to the session's image history
-        session_data['images'].append({
+        append_user_data_list(session_id, 'images', {
             'image_id': result.get('image_id'),
             'image_url': result.get('image_url'),
             'timestamp': result.get('timestamp', int(time.time())),
             'analysis': result.get('analysis', {})
-        })
-        
-        # Update session data
-        store_user_data(session_id, session_data, user_id)
+        }, user_id)
         
         return {
             'statusCode': 200,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+            'headers': CORS_HEADERS,
+            'body': _dumps({
                 'success': True,
                 'session_id': session_id,
                 'image_id': result.get('image_id'),
@@ -217,11 +293,11 @@ def handle_image_upload_request(event: Dict[str, Any]) -> Dict[str, Any]:
             })
         }
     except Exception as e:
-        logger.error(f"Error processing image upload: {e}")
+        logger.error("Error processing image upload: %s", e)
         return {
             'statusCode': 500,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'success': False, 'error': str(e)})
+            'headers': CORS_HEADERS,
+            'body': _dumps({'success': False, 'error': str(e)})
         }
 
 def handle_nft_image_request(event: Dict[str, Any]) -> Dict[str, Any]:
@@ -245,8 +321,8 @@ def handle_nft_image_request(event: Dict[str, Any]) -> Dict[str, Any]:
         if not contract_address:
             return {
                 'statusCode': 400,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': False, 'error': 'Contract address is required'})
+                'headers': CORS_HEADERS,
+                'body': _dumps({'success': False, 'error': 'Contract address is required'})
             }
         
         # Parse token IDs if provided
@@ -255,23 +331,23 @@ def handle_nft_image_request(event: Dict[str, Any]) -> Dict[str, Any]:
             token_id_list = token_ids.split(',')
         
         # Get NFT images
-        result = get_nft_images(contract_address, token_id_list)
+        result = get_nft_images_cached(contract_address, token_id_list)
         
         return {
             'statusCode': 200,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+            'headers': CORS_HEADERS,
+            'body': _dumps({
                 'success': True,
                 'contract_address': contract_address,
                 'images': result.get('images', [])
             })
         }
     except Exception as e:
-        logger.error(f"Error retrieving NFT images: {e}")
+        logger.error("Error retrieving NFT images: %s", e)
         return {
             'statusCode': 500,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'success': False, 'error': str(e)})
+            'headers': CORS_HEADERS,
+            'body': _dumps({'success': False, 'error': str(e)})
         }
 
 def handle_wallet_request(event: Dict[str, Any]) -> Dict[str, Any]:
@@ -296,8 +372,8 @@ def handle_wallet_request(event: Dict[str, Any]) -> Dict[str, Any]:
     else:
         return {
             'statusCode': 400,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'success': False, 'error': f"Invalid wallet endpoint: {path}"})
+            'headers': CORS_HEADERS,
+            'body': _dumps({'success': False, 'error': f"Invalid wallet endpoint: {path}"})
         }
 
 def handle_bedrock_image_request(event: Dict[str, Any]) -> Dict[str, Any]:
@@ -326,9 +402,6 @@ def handle_bedrock_image_request(event: Dict[str, Any]) -> Dict[str, Any]:
         contract_address = param_dict.get('contract_address')
         token_id = param_dict.get('token_id')
         
-        # Extract session info
-        session_id = event.get('sessionId')
-        
         if not contract_address:
             return {
                 'success': False,
@@ -340,7 +413,7 @@ def handle_bedrock_image_request(event: Dict[str, Any]) -> Dict[str, Any]:
         token_ids = [token_id] if token_id else None
         
         # Get NFT images
-        result = get_nft_images(contract_address, token_ids)
+        result = get_nft_images_cached(contract_address, token_ids)
         
         # Format response for Bedrock
         response = {
@@ -352,13 +425,21 @@ def handle_bedrock_image_request(event: Dict[str, Any]) -> Dict[str, Any]:
         
         return response
     except Exception as e:
-        logger.error(f"Error handling Bedrock image request: {e}")
+        logger.error("Error handling Bedrock image request: %s", e)
         return {
             'success': False,
             'error': str(e),
             'message': 'Failed to retrieve NFT images'
         }
 
+# Static fields of every rich media response sent to the Bedrock agent
+RICH_RESPONSE_FIELDS = {
+    "actionGroup": "NFTImageActions",
+    "apiPath": "/nft/images",
+    "httpMethod": "POST",
+    "httpStatusCode": 200
+}
+
 def bedrock_format_rich_response(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Format a rich response for Bedrock agent with text and image links
@@ -371,11 +452,7 @@ def bedrock_format_rich_response(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     # Extract image URLs if present
     images = data.get('images', [])
-    image_urls = []
-    
-    for image in images:
-        if 'image_url' in image:
-            image_urls.append(image['image_url'])
+    image_urls = [image['image_url'] for image in images if 'image_url' in image]
     
     # Generate text description
     text_content = data.get('message', '')
@@ -385,16 +462,14 @@ def bedrock_format_rich_response(data: Dict[str, Any]) -> Dict[str, Any]:
         else:
             text_content = data.get('error', 'An error occurred')
     
-    # Formatted response with images
+    # Formatted response with images; only the inner payload is serialized,
+    # the envelope is returned as a dict for the caller to encode once
     response = {
         "messageVersion": "1.0",
         "response": {
-            "actionGroup": "NFTImageActions",
-            "apiPath": "/nft/images",
-            "httpMethod": "POST",
-            "httpStatusCode": 200,
+            **RICH_RESPONSE_FIELDS,
             "responseBody": {
-                "application/json": json.dumps({
+                "application/json": _dumps({
                     "text": text_content,
                     "images": image_urls,
                     "data": data
@@ -404,4 +479,3 @@ def bedrock_format_rich_response(data: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     return response
-"""
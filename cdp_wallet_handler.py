@@ -5,13 +5,69 @@ import json
 import os
 import uuid
 import time
-import requests
+import logging
+import threading
+import httpx
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+
+# Prefer orjson for encoding payloads and decoding CDP responses
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
 
 # Import the CDP wallet connector - this is a JavaScript module that's executed via a Node.js runtime
 # We'll use native Python methods to directly call CDP APIs instead of relying on the JS connector
 
+# Shared HTTP/2 client so warm Lambda invocations and concurrent CDP calls
+# reuse one multiplexed keep-alive connection
+CDP_TIMEOUT = (3, 10)  # (connect, read) seconds
+CDP_RETRIES = 3
+CDP_RETRY_BACKOFF = 0.2  # seconds, doubled per attempt
+CDP_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+_HTTPX = httpx.Client(
+    # Transport retries cover connection failures only
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=CDP_RETRIES,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=128)
+    ),
+    timeout=httpx.Timeout(CDP_TIMEOUT[1], connect=CDP_TIMEOUT[0]),
+    headers={"Content-Type": "application/json"}
+)
+
+# Cap in-flight CDP requests per process so bursts don't trip CDP rate limits
+CDP_MAX_CONCURRENCY = int(os.environ.get("CDP_MAX_CONCURRENCY", "64"))
+_CDP_SEMAPHORE = threading.BoundedSemaphore(CDP_MAX_CONCURRENCY)
+
+def _http_request(method, url, body=None, headers=None):
+    """
+    Send a CDP HTTP request over the shared client
+    
+    Throttled or unavailable responses are retried with backoff for GET
+    only; payment and connect POSTs are never replayed.
+    """
+    attempt = 0
+    while True:
+        response = _HTTPX.request(method, url, content=body, headers=headers)
+        if method != "GET" or response.status_code not in CDP_RETRY_STATUSES or attempt >= CDP_RETRIES:
+            return response
+        time.sleep(CDP_RETRY_BACKOFF * 2 ** attempt)
+        attempt += 1
+
+@lru_cache(maxsize=1)
 def get_cdp_app_id():
     """Get CDP app ID from environment"""
     app_id = os.environ.get('CDP_WALLET_APP_ID', '')
@@ -19,10 +75,124 @@ def get_cdp_app_id():
         raise ValueError("CDP_WALLET_APP_ID environment variable is not set")
     return app_id
 
+@lru_cache(maxsize=1)
 def get_cdp_api_endpoint():
     """Get CDP API endpoint from environment or use default"""
     return os.environ.get('CDP_API_ENDPOINT', 'https://api.cdp.io')
 
+@lru_cache(maxsize=1)
+def get_cdp_auth_headers():
+    """Get the CDP Authorization header, built once from the app ID"""
+    return {"Authorization": f"Bearer {get_cdp_app_id()}"}
+
+@lru_cache(maxsize=1)
+def _connect_payload_template():
+    """Get the constant fields of a CDP connect payload"""
+    return {"app_id": get_cdp_app_id(), "connection_type": "server_side"}
+
+@lru_cache(maxsize=1)
+def _transact_payload_template():
+    """Get the constant fields of a CDP transaction payload"""
+    return {"app_id": get_cdp_app_id(), "transaction_type": "payment"}
+
+# Optional Redis (ElastiCache) cache for balance lookups, enabled by REDIS_URL.
+# Balances gate payments, so entries are short-lived and dropped on every
+# completed transaction
+BALANCE_CACHE_TTL = 15  # seconds
+
+try:
+    import redis
+    _RC = redis.Redis.from_url(os.environ['REDIS_URL'], socket_timeout=0.2, decode_responses=True) if os.environ.get('REDIS_URL') else None
+except ImportError:
+    _RC = None
+
+def _balance_cache_key(wallet_address):
+    """Redis key holding a wallet's cached balance"""
+    return f"cdp:bal:{wallet_address}"
+
+def _invalidate_balance(wallet_address):
+    """Drop a wallet's cached balance after it changed"""
+    if _RC is not None:
+        try:
+            _RC.delete(_balance_cache_key(wallet_address))
+        except redis.RedisError as cache_error:
+            logger.warning("Could not invalidate cached CDP balance: %s", cache_error)
+
+def _error_message(status, data, default):
+    """Extract an error message from a failed CDP response"""
+    if isinstance(data, dict) and "error" in data:
+        return data["error"]
+    return default if data is not None else f"HTTP error {status}"
+
+def _parse_error(response, default):
+    """Extract an error message from a failed CDP HTTP response"""
+    data = None
+    if response.content:
+        try:
+            data = _loads(response.content)
+        except ValueError:
+            pass
+    return _error_message(response.status_code, data, default)
+
+# DynamoDB resource and table handles, created on first use and reused
+_DDB = None
+_TABLES = {}
+
+def _table(table_name):
+    """Get a cached DynamoDB Table handle"""
+    global _DDB
+    table = _TABLES.get(table_name)
+    if table is None:
+        if _DDB is None:
+            _DDB = boto3.resource('dynamodb')
+        table = _TABLES[table_name] = _DDB.Table(table_name)
+    return table
+
+# Low-level DynamoDB client for session reads; skips the resource layer's
+# per-call type (de)serialization
+_DDB_CLIENT = None
+SESSION_FIELDS = ('cdp_session', 'wallet_type', 'created_at')
+SESSION_PROJECTION = ','.join(SESSION_FIELDS)
+
+def _ddb_client():
+    """Get the shared low-level DynamoDB client"""
+    global _DDB_CLIENT
+    if _DDB_CLIENT is None:
+        _DDB_CLIENT = boto3.client(
+            'dynamodb',
+            config=Config(tcp_keepalive=True, max_pool_connections=64)
+        )
+    return _DDB_CLIENT
+
+def _session_info_from_item(item):
+    """Read session fields out of a raw (typed) DynamoDB item"""
+    return {field: item.get(field, {}).get('S') for field in SESSION_FIELDS}
+
+def _cdp_call(method, path, payload=None):
+    """
+    Call the CDP API
+    
+    Args:
+        method: HTTP method
+        path: API path, e.g. /v1/connect
+        payload: Optional JSON payload
+        
+    Returns:
+        tuple: (ok, data) where data is the parsed response body on success,
+        or the API error message (None if the API gave none) on failure
+    """
+    with _CDP_SEMAPHORE:
+        response = _http_request(
+            method,
+            f"{get_cdp_api_endpoint()}{path}",
+            _dumps(payload) if payload is not None else None,
+            get_cdp_auth_headers()
+        )
+    
+    if response.status_code == 200:
+        return True, _loads(response.content)
+    return False, _parse_error(response, None)
+
 def connect_cdp_wallet(wallet_address, wallet_type):
     """
     Connect a wallet to CDP
@@ -34,49 +204,29 @@ def connect_cdp_wallet(wallet_address, wallet_type):
     Returns:
         dict: CDP connection result
     """
-    app_id = get_cdp_app_id()
-    api_endpoint = get_cdp_api_endpoint()
-    
     # Prepare request payload
     payload = {
-        "app_id": app_id,
+        **_connect_payload_template(),
         "wallet_address": wallet_address,
-        "wallet_type": wallet_type or "metamask",
-        "connection_type": "server_side"
+        "wallet_type": wallet_type or "metamask"
     }
     
     try:
         # Call CDP API to connect wallet
-        response = requests.post(
-            f"{api_endpoint}/v1/connect",
-            json=payload,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {app_id}"
-            }
-        )
+        ok, result = _cdp_call("POST", "/v1/connect", payload)
         
-        if response.status_code == 200:
-            result = response.json()
+        if ok:
             return {
                 "connected": True,
                 "wallet_address": wallet_address,
                 "wallet_type": wallet_type,
-                "cdp_session": result.get("session_id", str(uuid.uuid4())),
+                "cdp_session": result.get("session_id", uuid.uuid4().hex),
                 "timestamp": int(time.time())
             }
         else:
-            error_message = "Failed to connect to CDP"
-            try:
-                error_json = response.json()
-                if "error" in error_json:
-                    error_message = error_json["error"]
-            except:
-                error_message = f"HTTP error {response.status_code}"
-                
             return {
                 "connected": False,
-                "error": error_message
+                "error": result or "Failed to connect to CDP"
             }
     
     except Exception as e:
@@ -97,33 +247,22 @@ def execute_cdp_transaction(wallet_address, amount, currency):
     Returns:
         dict: Transaction result
     """
-    app_id = get_cdp_app_id()
-    api_endpoint = get_cdp_api_endpoint()
-    
     # Prepare transaction payload
     payload = {
-        "app_id": app_id,
+        **_transact_payload_template(),
         "wallet_address": wallet_address,
         "amount": amount,
-        "currency": currency,
-        "transaction_type": "payment"
+        "currency": currency
     }
     
     try:
         # Call CDP API to execute transaction
-        response = requests.post(
-            f"{api_endpoint}/v1/transact",
-            json=payload,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {app_id}"
-            }
-        )
+        ok, result = _cdp_call("POST", "/v1/transact", payload)
         
-        if response.status_code == 200:
-            result = response.json()
+        if ok:
+            _invalidate_balance(wallet_address)
             return {
-                "transaction_id": result.get("transaction_id", f"cdp-tx-{str(uuid.uuid4())[:8]}"),
+                "transaction_id": result.get("transaction_id", f"cdp-tx-{uuid.uuid4().hex[:8]}"),
                 "wallet_address": wallet_address,
                 "amount": amount,
                 "currency": currency,
@@ -131,17 +270,9 @@ def execute_cdp_transaction(wallet_address, amount, currency):
                 "timestamp": int(time.time())
             }
         else:
-            error_message = "Failed to execute CDP transaction"
-            try:
-                error_json = response.json()
-                if "error" in error_json:
-                    error_message = error_json["error"]
-            except:
-                error_message = f"HTTP error {response.status_code}"
-                
             return {
                 "success": False,
-                "error": error_message
+                "error": result or "Failed to execute CDP transaction"
             }
     
     except Exception as e:
@@ -150,47 +281,50 @@ def execute_cdp_transaction(wallet_address, amount, currency):
             "error": f"CDP transaction error: {str(e)}"
         }
 
-def get_cdp_balance(wallet_address):
+def get_cdp_balance(wallet_address, from_cache=True):
     """
     Get balance information for a CDP wallet
     
     Args:
         wallet_address: The wallet address to check
+        from_cache: Whether a cached balance may be returned
         
     Returns:
         dict: Balance information
     """
-    app_id = get_cdp_app_id()
-    api_endpoint = get_cdp_api_endpoint()
+    get_cdp_app_id()  # Fail fast if CDP isn't configured
+    cache_key = _balance_cache_key(wallet_address)
+    
+    if from_cache and _RC is not None:
+        try:
+            cached = _RC.get(cache_key)
+            if cached:
+                return _loads(cached)
+        except redis.RedisError:
+            pass
     
     try:
         # Call CDP API to get balance
-        response = requests.get(
-            f"{api_endpoint}/v1/balance/{wallet_address}",
-            headers={
-                "Authorization": f"Bearer {app_id}"
-            }
-        )
+        ok, result = _cdp_call("GET", f"/v1/balance/{wallet_address}")
         
-        if response.status_code == 200:
-            result = response.json()
-            return {
+        if ok:
+            balance = {
                 "wallet_address": wallet_address,
                 "balances": result.get("balances", []),
                 "timestamp": int(time.time())
             }
+            
+            if _RC is not None:
+                try:
+                    _RC.setex(cache_key, BALANCE_CACHE_TTL, _dumps(balance))
+                except redis.RedisError:
+                    pass
+                    
+            return balance
         else:
-            error_message = "Failed to get CDP balance"
-            try:
-                error_json = response.json()
-                if "error" in error_json:
-                    error_message = error_json["error"]
-            except:
-                error_message = f"HTTP error {response.status_code}"
-                
             return {
                 "success": False,
-                "error": error_message
+                "error": result or "Failed to get CDP balance"
             }
     
     except Exception as e:
@@ -199,6 +333,31 @@ def get_cdp_balance(wallet_address):
             "error": f"CDP balance check error: {str(e)}"
         }
 
+def _safe_put(table_name, item):
+    """
+    Store a CDP session row, logging instead of raising on failure
+    
+    Only writes when the session changed; reconnects with the same session
+    fail the condition and leave the row as is.
+    
+    Args:
+        table_name: The DynamoDB table to write to
+        item: The session row to store
+    """
+    try:
+        _table(table_name).put_item(
+            Item=item,
+            ConditionExpression='attribute_not_exists(wallet_address) OR cdp_session <> :s',
+            ExpressionAttributeValues={':s': item.get('cdp_session')},
+            ReturnValues='NONE'
+        )
+    except ClientError as db_error:
+        if db_error.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            logger.warning("Could not store CDP session: %s", db_error)
+    except Exception as db_error:
+        logger.warning("Could not store CDP session: %s", db_error)
+    _session_cache_invalidate(item['wallet_address'])
+
 def handle_cdp_connection(wallet_address, wallet_type=None):
     """
     Handle CDP wallet connection
@@ -214,25 +373,19 @@ def handle_cdp_connection(wallet_address, wallet_type=None):
         connection_result = connect_cdp_wallet(wallet_address, wallet_type)
         
         if connection_result.get('connected', False):
-            # Store CDP session in DynamoDB if available
-            try:
-                dynamodb = boto3.resource('dynamodb')
-                table_name = os.environ.get('CDP_SESSIONS_TABLE', 'CDPWalletSessions')
-                
-                # Check if table exists and create if needed
-                try:
-                    table = dynamodb.Table(table_name)
-                    table.put_item(Item={
-                        'wallet_address': wallet_address,
-                        'cdp_session': connection_result.get('cdp_session'),
-                        'wallet_type': wallet_type or 'metamask',
-                        'created_at': datetime.now().isoformat(),
-                        'timestamp': int(time.time())
-                    })
-                except Exception as db_error:
-                    print(f"Warning: Could not store CDP session: {str(db_error)}")
-            except Exception as e:
-                print(f"DynamoDB error: {str(e)}")
+            # One timestamp for the stored record and the response
+            timestamp = connection_result.get('timestamp') or int(time.time())
+            
+            # Store CDP session in DynamoDB before responding so the next
+            # request can read it
+            table_name = os.environ.get('CDP_SESSIONS_TABLE', 'CDPWalletSessions')
+            _safe_put(table_name, {
+                'wallet_address': wallet_address,
+                'cdp_session': connection_result.get('cdp_session'),
+                'wallet_type': wallet_type or 'metamask',
+                'created_at': datetime.fromtimestamp(timestamp).isoformat(),
+                'timestamp': timestamp
+            })
             
             return {
                 'success': True,
@@ -241,7 +394,7 @@ def handle_cdp_connection(wallet_address, wallet_type=None):
                 'wallet_type': wallet_type,
                 'cdp_session': connection_result.get('cdp_session'),
                 'message': f"Your {wallet_type or 'wallet'} has been successfully connected to CDP!",
-                'timestamp': connection_result.get('timestamp', int(time.time()))
+                'timestamp': timestamp
             }
         else:
             return {
@@ -273,27 +426,31 @@ def process_cdp_transaction(wallet_address, amount, currency="ETH", transaction_
         transaction_result = execute_cdp_transaction(wallet_address, amount, currency)
         
         if transaction_result.get('transaction_id'):
-            # Store transaction in DynamoDB if available
+            # One timestamp for the stored record and the response
+            timestamp = transaction_result.get('timestamp') or int(time.time())
+            
+            # Record the transaction before reporting success; a payment the
+            # ledger does not have must not look complete to the caller
+            table_name = os.environ.get('TRANSACTION_TABLE_NAME', 'NFTPaymentTransactions')
             try:
-                dynamodb = boto3.resource('dynamodb')
-                table_name = os.environ.get('TRANSACTION_TABLE_NAME', 'NFTPaymentTransactions')
-                
-                try:
-                    table = dynamodb.Table(table_name)
-                    table.put_item(Item={
-                        'transaction_id': transaction_result.get('transaction_id'),
-                        'wallet_address': wallet_address,
-                        'amount': amount,
-                        'currency': currency,
-                        'payment_method': 'cdp',
-                        'status': transaction_result.get('status', 'pending'),
-                        'created_at': datetime.now().isoformat(),
-                        'timestamp': int(time.time())
-                    })
-                except Exception as db_error:
-                    print(f"Warning: Could not store CDP transaction: {str(db_error)}")
-            except Exception as e:
-                print(f"DynamoDB error: {str(e)}")
+                _table(table_name).put_item(Item={
+                    'transaction_id': transaction_result.get('transaction_id'),
+                    'wallet_address': wallet_address,
+                    'amount': amount,
+                    'currency': currency,
+                    'payment_method': 'cdp',
+                    'status': transaction_result.get('status', 'pending'),
+                    'created_at': datetime.fromtimestamp(timestamp).isoformat(),
+                    'timestamp': timestamp
+                })
+            except Exception as db_error:
+                logger.error("Could not store CDP transaction %s: %s", transaction_result.get('transaction_id'), db_error)
+                return {
+                    'success': False,
+                    'transaction_id': transaction_result.get('transaction_id'),
+                    'status': transaction_result.get('status', 'pending'),
+                    'error': f"CDP transaction could not be recorded: {str(db_error)}"
+                }
             
             return {
                 'success': True,
@@ -301,7 +458,7 @@ def process_cdp_transaction(wallet_address, amount, currency="ETH", transaction_
                 'status': transaction_result.get('status', 'pending'),
                 'amount': amount,
                 'currency': currency,
-                'timestamp': transaction_result.get('timestamp', int(time.time()))
+                'timestamp': timestamp
             }
         else:
             return {
@@ -314,6 +471,95 @@ def process_cdp_transaction(wallet_address, amount, currency="ETH", transaction_
             'error': f"CDP transaction error: {str(e)}"
         }
 
+# Worker pool for overlapping independent CDP and DynamoDB lookups
+_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# Short-lived cache of found CDP session rows so polling clients don't hit DynamoDB
+SESSION_CACHE_TTL = 60  # seconds
+SESSION_CACHE_MAX_SIZE = 4096
+
+_SESSION_CACHE = OrderedDict()
+_SESSION_CACHE_LOCK = threading.Lock()
+
+def _session_cache_get(wallet_address):
+    """Get cached session info for a wallet, or None if missing or expired"""
+    with _SESSION_CACHE_LOCK:
+        cached_item = _SESSION_CACHE.get(wallet_address)
+        if cached_item is None:
+            return None
+        if time.monotonic() - cached_item['timestamp'] >= SESSION_CACHE_TTL:
+            del _SESSION_CACHE[wallet_address]
+            return None
+        _SESSION_CACHE.move_to_end(wallet_address)
+        return cached_item['data']
+
+def _session_cache_put(wallet_address, session_info):
+    """Cache session info for a wallet, evicting the least recently used entry"""
+    with _SESSION_CACHE_LOCK:
+        _SESSION_CACHE[wallet_address] = {
+            'data': session_info,
+            'timestamp': time.monotonic()
+        }
+        _SESSION_CACHE.move_to_end(wallet_address)
+        if len(_SESSION_CACHE) > SESSION_CACHE_MAX_SIZE:
+            _SESSION_CACHE.popitem(last=False)
+
+def _session_cache_invalidate(wallet_address):
+    """Drop cached session info for a wallet"""
+    with _SESSION_CACHE_LOCK:
+        _SESSION_CACHE.pop(wallet_address, None)
+
+def _get_cdp_session_info(wallet_address):
+    """
+    Get stored CDP session info for a wallet from DynamoDB
+    
+    Args:
+        wallet_address: The wallet address to look up
+        
+    Returns:
+        dict: Session info, empty if not found or unavailable
+    """
+    cached_info = _session_cache_get(wallet_address)
+    if cached_info is not None:
+        return cached_info
+        
+    session_info = {}
+    try:
+        table_name = os.environ.get('CDP_SESSIONS_TABLE', 'CDPWalletSessions')
+        
+        try:
+            response = _ddb_client().get_item(
+                TableName=table_name,
+                Key={'wallet_address': {'S': wallet_address}},
+                ProjectionExpression=SESSION_PROJECTION
+            )
+            if 'Item' in response:
+                session_info = _session_info_from_item(response['Item'])
+                # Misses aren't cached so a session created afterwards is seen at once
+                _session_cache_put(wallet_address, session_info)
+        except Exception as db_error:
+            logger.warning("Could not retrieve CDP session: %s", db_error)
+    except Exception as e:
+        logger.error("DynamoDB error: %s", e)
+    return session_info
+
+def _wallet_info_response(wallet_address, balance_result, session_info):
+    """Build the get_cdp_wallet_info response from balance and session lookups"""
+    if balance_result.get('balances'):
+        return {
+            'success': True,
+            'wallet_address': wallet_address,
+            'balances': balance_result.get('balances', []),
+            'is_cdp_connected': True,
+            'session_info': session_info,
+            'timestamp': balance_result.get('timestamp') or int(time.time())
+        }
+    else:
+        return {
+            'success': False,
+            'error': balance_result.get('error', 'Failed to get CDP wallet information')
+        }
+
 def get_cdp_wallet_info(wallet_address):
     """
     Get CDP wallet information
@@ -325,43 +571,13 @@ def get_cdp_wallet_info(wallet_address):
         dict: Wallet information
     """
     try:
-        # Get balance from CDP
-        balance_result = get_cdp_balance(wallet_address)
+        # Get balance from CDP and session info from DynamoDB concurrently
+        balance_future = _EXECUTOR.submit(get_cdp_balance, wallet_address)
+        session_future = _EXECUTOR.submit(_get_cdp_session_info, wallet_address)
+        balance_result = balance_future.result()
+        session_info = session_future.result() if balance_result.get('balances') else {}
         
-        if balance_result.get('balances'):
-            # Get CDP session info from DynamoDB if available
-            session_info = {}
-            try:
-                dynamodb = boto3.resource('dynamodb')
-                table_name = os.environ.get('CDP_SESSIONS_TABLE', 'CDPWalletSessions')
-                
-                try:
-                    table = dynamodb.Table(table_name)
-                    response = table.get_item(Key={'wallet_address': wallet_address})
-                    if 'Item' in response:
-                        session_info = {
-                            'cdp_session': response['Item'].get('cdp_session'),
-                            'wallet_type': response['Item'].get('wallet_type'),
-                            'created_at': response['Item'].get('created_at')
-                        }
-                except Exception as db_error:
-                    print(f"Warning: Could not retrieve CDP session: {str(db_error)}")
-            except Exception as e:
-                print(f"DynamoDB error: {str(e)}")
-            
-            return {
-                'success': True,
-                'wallet_address': wallet_address,
-                'balances': balance_result.get('balances', []),
-                'is_cdp_connected': True,
-                'session_info': session_info,
-                'timestamp': balance_result.get('timestamp', int(time.time()))
-            }
-        else:
-            return {
-                'success': False,
-                'error': balance_result.get('error', 'Failed to get CDP wallet information')
-            }
+        return _wallet_info_response(wallet_address, balance_result, session_info)
     except Exception as e:
         return {
             'success': False,
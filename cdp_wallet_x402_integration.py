@@ -6,23 +6,66 @@ and X402 payment capabilities.
 """
 import os
 import json
-import uuid
+import secrets
 import logging
 import time
 import base64
-import requests
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("cdp_wallet_integration")
 
+# Prefer orjson for encoding response bodies
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+    
+    _dumps_bytes = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+    
+    def _dumps_bytes(obj):
+        return json.dumps(obj).encode()
+
+def _new_id() -> str:
+    """Generate a random 22-character URL-safe session or transaction ID"""
+    return secrets.token_urlsafe(16)
+
+# Shared response headers, built once instead of per response
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+PAYMENT_REQUIRED_HEADERS = {**CORS_HEADERS, 'X-Payment-Required': 'x402'}
+
 # Try to import from session manager
 try:
-    from session_manager import get_wallet_address, store_wallet_address, get_user_data, store_user_data
+    from session_manager import (
+        get_wallet_address, store_wallet_address, get_user_data, store_user_data,
+        get_session, update_wallet_session
+    )
 except ImportError:
     logger.warning("Could not import session_manager module")
     from enhanced_wallet_login import get_wallet_address, store_wallet_address, get_user_data, store_user_data
+    
+    def get_session(session_id, user_id=None):
+        return get_wallet_address(session_id, user_id), get_user_data(session_id, user_id)
+    
+    def update_wallet_session(session_id, wallet_address, user_id=None, updates=None):
+        store_wallet_address(session_id, wallet_address, user_id)
+        data = get_user_data(session_id, user_id) or {}
+        for field, value in (updates or {}).items():
+            if value is None:
+                data.pop(field, None)
+            else:
+                data[field] = value
+        return store_user_data(session_id, data=data, user_id=user_id)
 
 # Import CDP wallet handler
 try:
@@ -39,7 +82,7 @@ except ImportError:
     def connect_cdp_wallet(wallet_address, wallet_type):
         return {
             'success': True,
-            'session_id': str(uuid.uuid4()),
+            'session_id': _new_id(),
             'wallet_address': wallet_address,
             'wallet_type': wallet_type,
             'expiration': int(time.time()) + 3600  # 1 hour expiration
@@ -62,7 +105,7 @@ except ImportError:
         }
     
     def create_cdp_transaction(wallet_address, recipient, amount, currency='ETH', nonce=None):
-        tx_id = str(uuid.uuid4())
+        tx_id = _new_id()
         return {
             'success': True,
             'transaction_id': tx_id,
@@ -93,11 +136,11 @@ except ImportError:
             'resource': resource_id,
             'timestamp': int(time.time())
         }
-        return base64.b64encode(json.dumps(mock_header).encode()).decode()
+        return base64.b64encode(_dumps_bytes(mock_header)).decode('ascii')
     
     def verify_payment(payment_header):
         try:
-            decoded = json.loads(base64.b64decode(payment_header).decode())
+            decoded = _loads(base64.b64decode(payment_header))
             return {
                 'success': True,
                 'verified': True,
@@ -110,7 +153,7 @@ except ImportError:
     def process_x402_payment(payment_header, resource_id):
         return {
             'success': True,
-            'transaction_id': str(uuid.uuid4()),
+            'transaction_id': _new_id(),
             'status': 'completed',
             'resource_id': resource_id
         }
@@ -128,482 +171,614 @@ except ImportError:
             }
         }
 
-def handle_cdp_wallet_connection(event: Dict[str, Any]) -> Dict[str, Any]:
+# Verified payment headers, so clients re-sending the same header skip
+# signature verification; shared through Redis when REDIS_URL is set
+VERIFY_CACHE_TTL = 60  # seconds
+VERIFY_CACHE_MAX_SIZE = 4096
+
+try:
+    import redis
+    _RC = redis.Redis.from_url(os.environ['REDIS_URL'], socket_timeout=0.2) if os.environ.get('REDIS_URL') else None
+except ImportError:
+    _RC = None
+
+_VERIFY_CACHE = OrderedDict()
+_VERIFY_CACHE_LOCK = threading.Lock()
+
+def _verify_cache_get(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Get a cached verification, or None if missing or expired"""
+    with _VERIFY_CACHE_LOCK:
+        cached_item = _VERIFY_CACHE.get(cache_key)
+        if cached_item is None:
+            return None
+        if time.monotonic() - cached_item['timestamp'] >= VERIFY_CACHE_TTL:
+            del _VERIFY_CACHE[cache_key]
+            return None
+        _VERIFY_CACHE.move_to_end(cache_key)
+        return cached_item['data']
+
+def _verify_cache_put(cache_key: str, verification: Dict[str, Any]) -> None:
+    """Cache a verification, evicting the least recently used entry"""
+    with _VERIFY_CACHE_LOCK:
+        _VERIFY_CACHE[cache_key] = {
+            'data': verification,
+            'timestamp': time.monotonic()
+        }
+        _VERIFY_CACHE.move_to_end(cache_key)
+        if len(_VERIFY_CACHE) > VERIFY_CACHE_MAX_SIZE:
+            _VERIFY_CACHE.popitem(last=False)
+
+def _verify_payment_cached(payment_header: str) -> Dict[str, Any]:
     """
-    Handle CDP wallet connection with signature verification
+    Verify an X402 payment header, reusing recent successful verifications
+    
+    Args:
+        payment_header: The x-payment header value
+        
+    Returns:
+        Verification result from verify_payment
+    """
+    digest = hashlib.blake2b(payment_header.encode(), digest_size=16).hexdigest()
+    cache_key = f"vp:{digest}"
+    
+    if _RC is not None:
+        try:
+            cached = _RC.get(cache_key)
+            if cached:
+                return _loads(cached)
+        except redis.RedisError:
+            pass
+    else:
+        cached = _verify_cache_get(cache_key)
+        if cached is not None:
+            return cached
+    
+    verification = verify_payment(payment_header)
+    
+    # Only successful verifications are cached; failures may be transient
+    if verification.get('verified'):
+        if _RC is not None:
+            try:
+                _RC.setex(cache_key, VERIFY_CACHE_TTL, _dumps(verification))
+            except redis.RedisError:
+                pass
+        else:
+            _verify_cache_put(cache_key, verification)
+    
+    return verification
+
+# Payment requirements per resource; they hold for the requirements'
+# validity window, so one lookup per resource per TTL is enough
+REQUIREMENTS_CACHE_TTL = 60  # seconds
+REQUIREMENTS_CACHE_MAX_SIZE = 8192
+
+_REQUIREMENTS_CACHE = OrderedDict()
+_REQUIREMENTS_CACHE_LOCK = threading.Lock()
+
+def _get_payment_requirements_cached(resource_id: str) -> Dict[str, Any]:
+    """
+    Get payment requirements for a resource, reusing recent lookups
+    
+    Args:
+        resource_id: The resource being paid for
+        
+    Returns:
+        Payment requirements from get_payment_requirements
+    """
+    with _REQUIREMENTS_CACHE_LOCK:
+        cached_item = _REQUIREMENTS_CACHE.get(resource_id)
+        if cached_item and time.monotonic() - cached_item['timestamp'] < REQUIREMENTS_CACHE_TTL:
+            _REQUIREMENTS_CACHE.move_to_end(resource_id)
+            return cached_item['data']
+    
+    requirements = get_payment_requirements(resource_id)
+    
+    with _REQUIREMENTS_CACHE_LOCK:
+        _REQUIREMENTS_CACHE[resource_id] = {
+            'data': requirements,
+            'timestamp': time.monotonic()
+        }
+        _REQUIREMENTS_CACHE.move_to_end(resource_id)
+        if len(_REQUIREMENTS_CACHE) > REQUIREMENTS_CACHE_MAX_SIZE:
+            _REQUIREMENTS_CACHE.popitem(last=False)
+    return requirements
+
+def _get_headers(event: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Get the request headers with lowercased names
+    
+    API Gateway v1 passes header names through with the client's casing, so
+    the handlers fold them once per request and pass the result down.
     
     Args:
         event: The API Gateway event
         
     Returns:
-        API Gateway response
+        Headers keyed by lowercase name
     """
-    # Extract method and path
-    method = event.get('httpMethod', 'POST')
-    path = event.get('path', '')
+    return {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+
+# Payment submissions by client Idempotency-Key, so retries get the first
+# response back instead of paying again. A key is reserved before the payment
+# is processed; the pending marker only lives long enough to cover one request
+IDEMPOTENCY_TTL = 600  # 10 minutes
+IDEMPOTENCY_PENDING_TTL = 60  # seconds
+IDEMPOTENCY_MAX_SIZE = 4096
+IDEMPOTENCY_PENDING = 'pending'
+IDEMPOTENCY_UNAVAILABLE = 'unavailable'
+
+_SUBMITTED = OrderedDict()
+_SUBMITTED_LOCK = threading.Lock()
+
+def _idempotency_key(session_id: str, wallet_address: str, resource_id: str, amount: Any,
+                     currency: str, client_key: str) -> str:
+    """Key identifying a payment submission across client retries"""
+    digest = hashlib.blake2b(
+        f"{session_id}|{wallet_address.lower()}|{resource_id}|{amount}|{currency}|{client_key}".encode(),
+        digest_size=16
+    ).hexdigest()
+    return f"idem:{digest}"
+
+def _reserve_submission(key: str) -> Optional[str]:
+    """
+    Atomically claim a submission key before processing the payment
     
-    # Extract session ID
-    session_id = event.get('headers', {}).get('x-session-id', None)
-    if not session_id and 'queryStringParameters' in event and event['queryStringParameters']:
-        session_id = event['queryStringParameters'].get('session_id')
+    Args:
+        key: Idempotency key of the submission
+        
+    Returns:
+        None if this request now owns the key; otherwise the stored response
+        body, IDEMPOTENCY_PENDING while another request is processing it, or
+        IDEMPOTENCY_UNAVAILABLE if the store could not be reached
+    """
+    if _RC is not None:
+        try:
+            for _ in range(2):
+                if _RC.set(key, IDEMPOTENCY_PENDING, ex=IDEMPOTENCY_PENDING_TTL, nx=True):
+                    return None
+                existing = _RC.get(key)
+                # The holder's entry may have expired between SET and GET
+                if existing is not None:
+                    return existing.decode()
+            return IDEMPOTENCY_PENDING
+        except redis.RedisError as e:
+            logger.error("Could not reserve payment submission: %s", e)
+            return IDEMPOTENCY_UNAVAILABLE
     
-    # Generate new session ID if none was provided
-    if not session_id:
-        session_id = str(uuid.uuid4())
+    now = time.monotonic()
+    with _SUBMITTED_LOCK:
+        cached_item = _SUBMITTED.get(key)
+        if cached_item and now < cached_item['expires']:
+            _SUBMITTED.move_to_end(key)
+            return cached_item['data']
+        _SUBMITTED[key] = {
+            'data': IDEMPOTENCY_PENDING,
+            'expires': now + IDEMPOTENCY_PENDING_TTL
+        }
+        _SUBMITTED.move_to_end(key)
+        if len(_SUBMITTED) > IDEMPOTENCY_MAX_SIZE:
+            _SUBMITTED.popitem(last=False)
+    return None
+
+def _complete_submission(key: str, response_body: str) -> None:
+    """Replace a submission's reservation with its final response body"""
+    if _RC is not None:
+        try:
+            _RC.set(key, response_body, ex=IDEMPOTENCY_TTL, xx=True)
+        except redis.RedisError as e:
+            logger.error("Could not record payment submission: %s", e)
+        return
     
-    # Handle CDP wallet connection endpoint
-    if method == 'POST' and path == '/cdp/wallet/connect':
+    with _SUBMITTED_LOCK:
+        _SUBMITTED[key] = {
+            'data': response_body,
+            'expires': time.monotonic() + IDEMPOTENCY_TTL
+        }
+
+def _release_submission(key: str) -> None:
+    """Drop a submission's reservation after the payment failed, so it can be retried"""
+    if _RC is not None:
         try:
-            # Parse body
-            body = json.loads(event.get('body', '{}'))
-            wallet_address = body.get('wallet_address')
-            wallet_type = body.get('wallet_type', 'cdp')
-            signature = body.get('signature')
-            message = body.get('message')
-            user_id = body.get('user_id')
-            
-            if not wallet_address:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': 'Wallet address is required',
-                        'session_id': session_id
-                    })
-                }
-                
-            # Verify signature if provided
-            if signature and message:
-                verification = verify_wallet_signature(wallet_address, message, signature)
-                if not verification.get('verified'):
-                    return {
-                        'statusCode': 401,
-                        'headers': {'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({
-                            'success': False,
-                            'error': 'Invalid signature',
-                            'session_id': session_id
-                        })
-                    }
-            
-            # Connect to CDP wallet
-            connection_result = connect_cdp_wallet(wallet_address, wallet_type)
+            _RC.delete(key)
+        except redis.RedisError as e:
+            logger.error("Could not release payment submission: %s", e)
+        return
+    
+    with _SUBMITTED_LOCK:
+        _SUBMITTED.pop(key, None)
+
+def _same_address(address: str, other: str) -> bool:
+    """Compare wallet addresses ignoring checksum casing, in constant time"""
+    return hmac.compare_digest(address.lower().encode(), other.lower().encode())
+
+def _get_session_id(event: Dict[str, Any], headers: Dict[str, str]) -> str:
+    """Get the session ID from the request, generating one if none was provided"""
+    session_id = headers.get('x-session-id')
+    if not session_id:
+        session_id = (event.get('queryStringParameters') or {}).get('session_id')
+    return session_id or _new_id()
+
+def _parse_body(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse the JSON request body; {} if missing or empty, None if malformed"""
+    body = event.get('body')
+    if not body:
+        return {}
+    try:
+        return _loads(body)
+    except ValueError:
+        return None
+
+def _error_response(status_code: int, error: str, session_id: str) -> Dict[str, Any]:
+    """Build an error response carrying the session ID"""
+    return {
+        'statusCode': status_code,
+        'headers': CORS_HEADERS,
+        'body': _dumps({
+            'success': False,
+            'error': error,
+            'session_id': session_id
+        })
+    }
+
+def _connect_cdp_wallet(event: Dict[str, Any], session_id: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Handle POST /cdp/wallet/connect"""
+    body = _parse_body(event)
+    if body is None:
+        return _error_response(400, 'Invalid JSON body', session_id)
+    
+    try:
+        wallet_address = body.get('wallet_address')
+        wallet_type = body.get('wallet_type', 'cdp')
+        signature = body.get('signature')
+        message = body.get('message')
+        user_id = body.get('user_id')
+        
+        if not wallet_address:
+            return _error_response(400, 'Wallet address is required', session_id)
             
-            if connection_result.get('success'):
-                # Store in session
-                store_wallet_address(session_id, wallet_address, user_id)
-                
-                # Store CDP-specific session info
-                user_data = get_user_data(session_id, user_id) or {}
-                user_data['cdp'] = {
+        # Verify signature if provided
+        if signature and message:
+            verification = verify_wallet_signature(wallet_address, message, signature)
+            if not verification.get('verified'):
+                return _error_response(401, 'Invalid signature', session_id)
+        
+        # Connect to CDP wallet
+        connection_result = connect_cdp_wallet(wallet_address, wallet_type)
+        
+        if connection_result.get('success'):
+            # Store the wallet and CDP-specific session info in one update
+            update_wallet_session(session_id, wallet_address, user_id, {
+                'cdp': {
                     'cdp_session_id': connection_result.get('session_id'),
                     'connected_at': int(time.time()),
                     'expiration': connection_result.get('expiration'),
                     'wallet_type': wallet_type
                 }
-                store_user_data(session_id, user_data, user_id)
-                
-                # Format response
-                return {
-                    'statusCode': 200,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': True,
-                        'wallet_address': wallet_address,
-                        'wallet_type': wallet_type,
-                        'message': 'CDP wallet connected successfully',
-                        'session_id': session_id,
-                        'expiration': connection_result.get('expiration')
-                    })
-                }
-            else:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': connection_result.get('error', 'Failed to connect CDP wallet'),
-                        'session_id': session_id
-                    })
-                }
-                
-        except Exception as e:
-            logger.error(f"Error connecting to CDP wallet: {e}")
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'success': False,
-                    'error': str(e),
-                    'session_id': session_id
-                })
-            }
-    
-    # Get CDP wallet status
-    elif method == 'GET' and path == '/cdp/wallet/status':
-        try:
-            # Get query parameters
-            params = event.get('queryStringParameters', {}) or {}
-            user_id = params.get('user_id')
-            
-            # Get wallet address from session
-            wallet_address = get_wallet_address(session_id, user_id)
-            
-            if not wallet_address:
-                return {
-                    'statusCode': 200,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': True,
-                        'connected': False,
-                        'message': 'No CDP wallet connected',
-                        'session_id': session_id
-                    })
-                }
-            
-            # Get user data for CDP details
-            user_data = get_user_data(session_id, user_id) or {}
-            cdp_data = user_data.get('cdp', {})
+            })
             
-            # Check if CDP session is still valid
-            if cdp_data.get('expiration', 0) < int(time.time()):
-                return {
-                    'statusCode': 200,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': True,
-                        'connected': False,
-                        'expired': True,
-                        'message': 'CDP wallet session has expired',
-                        'session_id': session_id
-                    })
-                }
-                
-            # Return wallet status
+            # Format response
             return {
                 'statusCode': 200,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
+                'headers': CORS_HEADERS,
+                'body': _dumps({
                     'success': True,
-                    'connected': True,
                     'wallet_address': wallet_address,
-                    'wallet_type': cdp_data.get('wallet_type', 'cdp'),
-                    'expiration': cdp_data.get('expiration'),
-                    'session_id': session_id
+                    'wallet_type': wallet_type,
+                    'message': 'CDP wallet connected successfully',
+                    'session_id': session_id,
+                    'expiration': connection_result.get('expiration')
                 })
             }
+        else:
+            return _error_response(400, connection_result.get('error', 'Failed to connect CDP wallet'), session_id)
             
-        except Exception as e:
-            logger.error(f"Error checking CDP wallet status: {e}")
+    except Exception as e:
+        logger.error("Error connecting to CDP wallet: %s", e)
+        return _error_response(500, str(e), session_id)
+
+def _get_cdp_wallet_status(event: Dict[str, Any], session_id: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Handle GET /cdp/wallet/status"""
+    try:
+        # Get query parameters
+        params = event.get('queryStringParameters') or {}
+        user_id = params.get('user_id')
+        
+        # Get wallet address and CDP details from session together
+        wallet_address, user_data = get_session(session_id, user_id)
+        
+        if not wallet_address:
             return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'success': False,
-                    'error': str(e),
+                'statusCode': 200,
+                'headers': CORS_HEADERS,
+                'body': _dumps({
+                    'success': True,
+                    'connected': False,
+                    'message': 'No CDP wallet connected',
                     'session_id': session_id
                 })
             }
-    
-    # Disconnect CDP wallet
-    elif method == 'POST' and path == '/cdp/wallet/disconnect':
-        try:
-            # Parse body
-            body = json.loads(event.get('body', '{}'))
-            user_id = body.get('user_id')
-            
-            # Clear wallet from session
-            store_wallet_address(session_id, '', user_id)
-            
-            # Clear CDP session data
-            user_data = get_user_data(session_id, user_id) or {}
-            if 'cdp' in user_data:
-                del user_data['cdp']
-            store_user_data(session_id, user_data, user_id)
-            
+        
+        cdp_data = (user_data or {}).get('cdp', {})
+        
+        # Check if CDP session is still valid
+        if cdp_data.get('expiration', 0) < int(time.time()):
             return {
                 'statusCode': 200,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
+                'headers': CORS_HEADERS,
+                'body': _dumps({
                     'success': True,
-                    'message': 'CDP wallet disconnected successfully',
+                    'connected': False,
+                    'expired': True,
+                    'message': 'CDP wallet session has expired',
                     'session_id': session_id
                 })
             }
             
-        except Exception as e:
-            logger.error(f"Error disconnecting CDP wallet: {e}")
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'success': False,
-                    'error': str(e),
-                    'session_id': session_id
-                })
-            }
-    
-    # Handle unknown paths
-    else:
+        # Return wallet status
         return {
-            'statusCode': 404,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
-                'success': False,
-                'error': 'Endpoint not found',
+            'statusCode': 200,
+            'headers': CORS_HEADERS,
+            'body': _dumps({
+                'success': True,
+                'connected': True,
+                'wallet_address': wallet_address,
+                'wallet_type': cdp_data.get('wallet_type', 'cdp'),
+                'expiration': cdp_data.get('expiration'),
                 'session_id': session_id
             })
         }
+        
+    except Exception as e:
+        logger.error("Error checking CDP wallet status: %s", e)
+        return _error_response(500, str(e), session_id)
 
-def handle_x402_payment(event: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Handle X402 payment protocol requests
+def _disconnect_cdp_wallet(event: Dict[str, Any], session_id: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Handle POST /cdp/wallet/disconnect"""
+    body = _parse_body(event)
+    if body is None:
+        return _error_response(400, 'Invalid JSON body', session_id)
     
-    Args:
-        event: The API Gateway event
+    try:
+        user_id = body.get('user_id')
         
-    Returns:
-        API Gateway response
-    """
-    # Extract method and path
-    method = event.get('httpMethod', 'GET')
-    path = event.get('path', '')
-    
-    # Extract session ID
-    session_id = event.get('headers', {}).get('x-session-id', None)
-    if not session_id and 'queryStringParameters' in event and event['queryStringParameters']:
-        session_id = event['queryStringParameters'].get('session_id')
-    
-    # Generate new session ID if none was provided
-    if not session_id:
-        session_id = str(uuid.uuid4())
-    
+        # Clear wallet and CDP session data from session
+        update_wallet_session(session_id, '', user_id, {'cdp': None})
+        
+        return {
+            'statusCode': 200,
+            'headers': CORS_HEADERS,
+            'body': _dumps({
+                'success': True,
+                'message': 'CDP wallet disconnected successfully',
+                'session_id': session_id
+            })
+        }
+        
+    except Exception as e:
+        logger.error("Error disconnecting CDP wallet: %s", e)
+        return _error_response(500, str(e), session_id)
+
+def _get_x402_payment_requirements(event: Dict[str, Any], session_id: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Handle GET /x402/payment/requirements"""
+    try:
+        # Get query parameters
+        params = event.get('queryStringParameters') or {}
+        requested_resource = params.get('resource_id')
+        
+        if not requested_resource:
+            return _error_response(400, 'Resource ID is required', session_id)
+        
+        # Get payment requirements
+        requirements = _get_payment_requirements_cached(requested_resource)
+        
+        # Return with 402 Payment Required status
+        return {
+            'statusCode': 402,
+            'headers': PAYMENT_REQUIRED_HEADERS,
+            'body': _dumps({
+                'success': True,
+                'payment_required': True,
+                'requirements': requirements,
+                'session_id': session_id
+            })
+        }
+        
+    except Exception as e:
+        logger.error("Error getting payment requirements: %s", e)
+        return _error_response(500, str(e), session_id)
+
+def _get_x402_resource(event: Dict[str, Any], session_id: str, headers: Dict[str, str], resource_id: str) -> Dict[str, Any]:
+    """Handle GET /x402/resource/{resource_id}"""
     # Check for x-payment header (X402 protocol)
-    payment_header = event.get('headers', {}).get('x-payment')
+    payment_header = headers.get('x-payment')
     
-    # Extract resource ID from path or query params
-    resource_id = None
-    if path.startswith('/x402/resource/'):
-        resource_id = path.split('/x402/resource/')[1]
-    elif 'queryStringParameters' in event and event['queryStringParameters']:
-        resource_id = event['queryStringParameters'].get('resource_id')
-    
-    # Get payment requirements for resource
-    if method == 'GET' and path == '/x402/payment/requirements':
-        try:
-            # Get query parameters
-            params = event.get('queryStringParameters', {}) or {}
-            requested_resource = params.get('resource_id')
-            
-            if not requested_resource:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': 'Resource ID is required',
-                        'session_id': session_id
-                    })
-                }
-            
-            # Get payment requirements
-            requirements = get_payment_requirements(requested_resource)
+    # If payment header is missing, return payment requirements
+    if not payment_header:
+        requirements = _get_payment_requirements_cached(resource_id)
+        return {
+            'statusCode': 402,
+            'headers': PAYMENT_REQUIRED_HEADERS,
+            'body': _dumps({
+                'payment_required': True,
+                'requirements': requirements,
+                'session_id': session_id
+            })
+        }
+        
+    try:
+        # Verify payment header
+        verification = _verify_payment_cached(payment_header)
+        
+        if not verification.get('verified'):
+            return _error_response(401, 'Invalid payment', session_id)
+        
+        # Process payment
+        payment_result = process_x402_payment(payment_header, resource_id)
+        
+        if payment_result.get('success'):
+            # Get resource data - replace with your actual resource retrieval logic
+            resource_data = {
+                'id': resource_id,
+                'type': 'premium_content',
+                'content': 'This is premium content that required X402 payment to access',
+                'transaction_id': payment_result.get('transaction_id')
+            }
             
-            # Return with 402 Payment Required status
+            # Return resource with payment info
             return {
-                'statusCode': 402,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'X-Payment-Required': 'x402'
-                },
-                'body': json.dumps({
+                'statusCode': 200,
+                'headers': CORS_HEADERS,
+                'body': _dumps({
                     'success': True,
-                    'payment_required': True,
-                    'requirements': requirements,
+                    'paid': True,
+                    'resource': resource_data,
+                    'transaction_id': payment_result.get('transaction_id'),
                     'session_id': session_id
                 })
             }
+        else:
+            return _error_response(400, payment_result.get('error', 'Payment processing failed'), session_id)
             
-        except Exception as e:
-            logger.error(f"Error getting payment requirements: {e}")
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'success': False,
-                    'error': str(e),
-                    'session_id': session_id
-                })
-            }
+    except Exception as e:
+        logger.error("Error processing X402 payment: %s", e)
+        return _error_response(500, str(e), session_id)
+
+def _submit_x402_payment(event: Dict[str, Any], session_id: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Handle POST /x402/payment/submit"""
+    body = _parse_body(event)
+    if body is None:
+        return _error_response(400, 'Invalid JSON body', session_id)
     
-    # Process resource request with payment
-    elif method == 'GET' and resource_id and path.startswith('/x402/resource/'):
-        # If payment header is missing, return payment requirements
-        if not payment_header:
-            requirements = get_payment_requirements(resource_id)
-            return {
-                'statusCode': 402,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'X-Payment-Required': 'x402'
-                },
-                'body': json.dumps({
-                    'payment_required': True,
-                    'requirements': requirements,
-                    'session_id': session_id
-                })
-            }
-            
-        try:
-            # Verify payment header
-            verification = verify_payment(payment_header)
-            
-            if not verification.get('verified'):
-                return {
-                    'statusCode': 401,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': 'Invalid payment',
-                        'session_id': session_id
-                    })
-                }
-            
-            # Process payment
-            payment_result = process_x402_payment(payment_header, resource_id)
-            
-            if payment_result.get('success'):
-                # Get resource data - replace with your actual resource retrieval logic
-                resource_data = {
-                    'id': resource_id,
-                    'type': 'premium_content',
-                    'content': 'This is premium content that required X402 payment to access',
-                    'transaction_id': payment_result.get('transaction_id')
-                }
-                
-                # Return resource with payment info
+    try:
+        resource_id = body.get('resource_id')
+        wallet_address = body.get('wallet_address')
+        amount = body.get('amount')
+        currency = body.get('currency', 'ETH')
+        user_id = body.get('user_id')
+        
+        if not resource_id or not wallet_address or not amount:
+            return _error_response(400, 'Resource ID, wallet address and amount are required', session_id)
+        
+        # Check if wallet is connected in our session
+        session_wallet = get_wallet_address(session_id, user_id)
+        if not session_wallet or not _same_address(session_wallet, wallet_address):
+            return _error_response(401, 'Wallet not connected or does not match session', session_id)
+        
+        # A retry carrying the same Idempotency-Key gets the first response
+        # instead of paying again; the key is claimed before processing
+        client_key = headers.get('idempotency-key')
+        submission_key = None
+        if client_key:
+            submission_key = _idempotency_key(session_id, wallet_address, resource_id, amount, currency, client_key)
+            submitted_body = _reserve_submission(submission_key)
+            if submitted_body == IDEMPOTENCY_UNAVAILABLE:
+                return _error_response(503, 'Could not reserve payment submission, please retry', session_id)
+            if submitted_body == IDEMPOTENCY_PENDING:
+                return _error_response(409, 'A payment with this Idempotency-Key is already being processed', session_id)
+            if submitted_body is not None:
                 return {
                     'statusCode': 200,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': True,
-                        'paid': True,
-                        'resource': resource_data,
-                        'transaction_id': payment_result.get('transaction_id'),
-                        'session_id': session_id
-                    })
-                }
-            else:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': payment_result.get('error', 'Payment processing failed'),
-                        'session_id': session_id
-                    })
+                    'headers': CORS_HEADERS,
+                    'body': submitted_body
                 }
-                
-        except Exception as e:
-            logger.error(f"Error processing X402 payment: {e}")
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'success': False,
-                    'error': str(e),
-                    'session_id': session_id
-                })
-            }
-    
-    # Submit X402 payment for a resource
-    elif method == 'POST' and path == '/x402/payment/submit':
+        
         try:
-            # Parse body
-            body = json.loads(event.get('body', '{}'))
-            resource_id = body.get('resource_id')
-            wallet_address = body.get('wallet_address')
-            amount = body.get('amount')
-            currency = body.get('currency', 'ETH')
-            user_id = body.get('user_id')
-            
-            if not resource_id or not wallet_address or not amount:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': 'Resource ID, wallet address and amount are required',
-                        'session_id': session_id
-                    })
-                }
-            
-            # Check if wallet is connected in our session
-            session_wallet = get_wallet_address(session_id, user_id)
-            if not session_wallet or session_wallet != wallet_address:
-                return {
-                    'statusCode': 401,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': 'Wallet not connected or does not match session',
-                        'session_id': session_id
-                    })
-                }
-            
             # Create payment header
             payment_header = create_payment_header(wallet_address, amount, currency, resource_id)
             
             # Process payment
             payment_result = process_x402_payment(payment_header, resource_id)
-            
-            if payment_result.get('success'):
-                return {
-                    'statusCode': 200,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': True,
-                        'transaction_id': payment_result.get('transaction_id'),
-                        'status': payment_result.get('status'),
-                        'payment_header': payment_header,  # Client can use this for subsequent requests
-                        'session_id': session_id
-                    })
-                }
-            else:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': False,
-                        'error': payment_result.get('error', 'Payment processing failed'),
-                        'session_id': session_id
-                    })
-                }
-                
-        except Exception as e:
-            logger.error(f"Error submitting X402 payment: {e}")
+        except Exception:
+            if submission_key:
+                _release_submission(submission_key)
+            raise
+        
+        if payment_result.get('success'):
+            response_body = _dumps({
+                'success': True,
+                'transaction_id': payment_result.get('transaction_id'),
+                'status': payment_result.get('status'),
+                'payment_header': payment_header,  # Client can use this for subsequent requests
+                'session_id': session_id
+            })
+            if submission_key:
+                _complete_submission(submission_key, response_body)
             return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'success': False,
-                    'error': str(e),
-                    'session_id': session_id
-                })
+                'statusCode': 200,
+                'headers': CORS_HEADERS,
+                'body': response_body
             }
+        else:
+            if submission_key:
+                _release_submission(submission_key)
+            return _error_response(400, payment_result.get('error', 'Payment processing failed'), session_id)
+            
+    except Exception as e:
+        logger.error("Error submitting X402 payment: %s", e)
+        return _error_response(500, str(e), session_id)
+
+# Endpoint handlers keyed by (method, path), so dispatch is one dict lookup
+CDP_WALLET_ROUTES = {
+    ('POST', '/cdp/wallet/connect'): _connect_cdp_wallet,
+    ('GET', '/cdp/wallet/status'): _get_cdp_wallet_status,
+    ('POST', '/cdp/wallet/disconnect'): _disconnect_cdp_wallet
+}
+
+X402_ROUTES = {
+    ('GET', '/x402/payment/requirements'): _get_x402_payment_requirements,
+    ('POST', '/x402/payment/submit'): _submit_x402_payment
+}
+
+X402_RESOURCE_PREFIX = '/x402/resource/'
+
+def handle_cdp_wallet_connection(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handle CDP wallet connection with signature verification
     
-    # Handle unknown paths
-    else:
-        return {
-            'statusCode': 404,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
-                'success': False,
-                'error': 'X402 endpoint not found',
-                'session_id': session_id
-            })
-        }
+    Args:
+        event: The API Gateway event
+        
+    Returns:
+        API Gateway response
+    """
+    headers = _get_headers(event)
+    session_id = _get_session_id(event, headers)
+    route = CDP_WALLET_ROUTES.get((event.get('httpMethod', 'POST'), event.get('path', '')))
+    if route is None:
+        return _error_response(404, 'Endpoint not found', session_id)
+    return route(event, session_id, headers)
+
+def handle_x402_payment(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handle X402 payment protocol requests
+    
+    Args:
+        event: The API Gateway event
+        
+    Returns:
+        API Gateway response
+    """
+    method = event.get('httpMethod', 'GET')
+    path = event.get('path', '')
+    headers = _get_headers(event)
+    session_id = _get_session_id(event, headers)
+    
+    route = X402_ROUTES.get((method, path))
+    if route is not None:
+        return route(event, session_id, headers)
+    
+    # Process resource request with payment
+    if method == 'GET':
+        resource_id = path.removeprefix(X402_RESOURCE_PREFIX)
+        if resource_id and resource_id != path:
+            return _get_x402_resource(event, session_id, headers, resource_id)
+    
+    return _error_response(404, 'X402 endpoint not found', session_id)
+
+_NOT_FOUND_BODY = _dumps({
+    'success': False,
+    'error': 'Endpoint not found'
+})
 
 def handle_combined_wallet_payment_request(event: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -625,9 +800,6 @@ def handle_combined_wallet_payment_request(event: Dict[str, Any]) -> Dict[str, A
     else:
         return {
             'statusCode': 404,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
-                'success': False,
-                'error': 'Endpoint not found'
-            })
+            'headers': CORS_HEADERS,
+            'body': _NOT_FOUND_BODY
         }
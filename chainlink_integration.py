@@ -4,15 +4,100 @@ Provides interface to interact with deployed smart contracts that use Chainlink
 """
 
 import requests
+import httpx
 import json
+import random
+import hashlib
 import logging
+import math
+import secrets
+import threading
 from decimal import Decimal
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import load_api_keys
 from web3 import Web3
 import time
 
 logger = logging.getLogger(__name__)
 
+# Prefer orjson for RPC bodies and deployment files
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    
+    _loads = json.loads
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+RPC_URLS = {
+    'ethereum': 'https://eth-mainnet.g.alchemy.com/v2/your-api-key',
+    'polygon': 'https://polygon-mainnet.g.alchemy.com/v2/your-api-key',
+    'avalanche': 'https://api.avax.network/ext/bc/C/rpc',
+    'sepolia': 'https://eth-sepolia.g.alchemy.com/v2/your-api-key'
+}
+
+# CCIP chain selectors, kept as strings because they exceed JSON's safe integer range
+CCIP_CHAIN_SELECTORS = {
+    'ethereum': '5009297550715157269',
+    'polygon': '4051577828743386545',
+    'avalanche': '6433500567565415381'
+}
+
+# (connect, read) timeouts for RPC calls
+RPC_TIMEOUT = (2, 10)
+
+RPC_RETRIES = 2
+RPC_USER_AGENT = 'agora-ai-chainlink'
+
+# Shared HTTP session for the Web3 providers so RPC calls reuse keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=RPC_RETRIES, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+))
+_SESSION.headers.update({'User-Agent': RPC_USER_AGENT})
+
+# HTTP/2 client for price feed reads so concurrent callers share one
+# multiplexed connection
+_HTTPX = httpx.Client(
+    # Transport retries cover connection failures only
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=RPC_RETRIES,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=32)
+    ),
+    timeout=httpx.Timeout(RPC_TIMEOUT[1], connect=RPC_TIMEOUT[0]),
+    headers={**JSON_HEADERS, 'User-Agent': RPC_USER_AGENT}
+)
+
+def _rpc_post(rpc_url, payload):
+    """POST a JSON-RPC payload over the shared HTTP/2 client"""
+    return _HTTPX.post(rpc_url, content=_dumps(payload))
+
+@lru_cache(maxsize=8)
+def _get_w3(network):
+    """Get the Web3 connection for a network, shared by all interfaces"""
+    rpc_url = RPC_URLS.get(network, RPC_URLS['ethereum'])
+    return Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': RPC_TIMEOUT}, session=_SESSION))
+
+@lru_cache(maxsize=8)
+def _get_deployment(network):
+    """Load deployed contract addresses for a network from its deployment file"""
+    try:
+        with open(f'deployments/{network}-deployment.json', 'rb') as f:
+            deployment_data = _loads(f.read())
+            return deployment_data.get('contracts', {})
+    except FileNotFoundError:
+        logger.warning(f"No deployment file found for {network}")
+        return {}
+
 class ChainlinkContractInterface:
     """Interface to interact with deployed Chainlink-integrated smart contracts"""
     
@@ -23,25 +108,11 @@ class ChainlinkContractInterface:
         
     def _initialize_web3(self):
         """Initialize Web3 connection based on network"""
-        rpc_urls = {
-            'ethereum': 'https://eth-mainnet.g.alchemy.com/v2/your-api-key',
-            'polygon': 'https://polygon-mainnet.g.alchemy.com/v2/your-api-key',
-            'avalanche': 'https://api.avax.network/ext/bc/C/rpc',
-            'sepolia': 'https://eth-sepolia.g.alchemy.com/v2/your-api-key'
-        }
-        
-        rpc_url = rpc_urls.get(self.network, rpc_urls['ethereum'])
-        return Web3(Web3.HTTPProvider(rpc_url))
+        return _get_w3(self.network)
     
     def _load_contract_addresses(self):
         """Load deployed contract addresses from deployment files"""
-        try:
-            with open(f'deployments/{self.network}-deployment.json', 'r') as f:
-                deployment_data = json.load(f)
-                return deployment_data.get('contracts', {})
-        except FileNotFoundError:
-            logger.warning(f"No deployment file found for {self.network}")
-            return {}
+        return _get_deployment(self.network)
     
     def get_defi_portfolio_value(self, user_address):
         """Get user's DeFi portfolio value using Chainlink price feeds"""
@@ -78,7 +149,7 @@ class ChainlinkContractInterface:
             return {
                 'success': True,
                 'data': {
-                    'vrf_request_id': f"vrf_req_{int(time.time())}",
+                    'vrf_request_id': f"vrf_req_{secrets.token_hex(8)}",
                     'status': 'pending',
                     'estimated_fulfillment': '2-5 minutes',
                     'chainlink_vrf': 'requested'
@@ -142,7 +213,7 @@ class ChainlinkContractInterface:
                     'price_per_share_usd': share_price_usd,
                     'eth_required': eth_required,
                     'total_cost_usd': share_price_usd * shares,
-                    'transaction_hash': f"0x{int(time.time()):x}",
+                    'transaction_hash': f"0x{secrets.token_hex(32)}",
                     'chainlink_price_feed': f'ETH/USD: ${eth_price}'
                 }
             }
@@ -216,19 +287,13 @@ class ChainlinkContractInterface:
             if not contract_address:
                 return {'success': False, 'error': 'Contract not deployed'}
             
-            chain_selectors = {
-                'ethereum': '5009297550715157269',
-                'polygon': '4051577828743386545',
-                'avalanche': '6433500567565415381'
-            }
-            
             return {
                 'success': True,
                 'data': {
-                    'message_id': f"ccip_msg_{int(time.time())}",
+                    'message_id': f"ccip_msg_{secrets.token_hex(16)}",
                     'source_chain': self.network,
                     'destination_chain': destination_chain,
-                    'destination_selector': chain_selectors.get(destination_chain),
+                    'destination_selector': CCIP_CHAIN_SELECTORS.get(destination_chain),
                     'operation_type': operation_type,
                     'amount': amount,
                     'token_address': token_address,
@@ -236,7 +301,10 @@ class ChainlinkContractInterface:
                     'estimated_delivery': '5-15 minutes',
                     'chainlink_ccip': 'message_sent'
                 }
-            }            return {'success': False, 'error': str(e)}
+            }
+        except Exception as e:
+            logger.error(f"Error sending cross-chain operation: {str(e)}")
+            return {'success': False, 'error': str(e)}
 
 
 # Legacy functions for backward compatibility with existing Lambda handler
@@ -269,7 +337,7 @@ def request_vrf_randomness(consumer_address=None, key_hash=None, fee=None, seed=
     return {
         'success': True,
         'data': {
-            'request_id': f"vrf_req_{int(time.time())}",
+            'request_id': f"vrf_req_{secrets.token_hex(8)}",
             'consumer_address': consumer_address,
             'status': 'pending',
             'estimated_fulfillment': '2-5 minutes'
@@ -304,7 +372,7 @@ def create_price_automation(price_threshold, asset_pair, callback_address):
     return {
         'success': True,
         'data': {
-            'automation_id': f"auto_{int(time.time())}",
+            'automation_id': f"auto_{secrets.token_hex(8)}",
             'price_threshold': price_threshold,
             'asset_pair': asset_pair,
             'callback_address': callback_address,
@@ -335,6 +403,136 @@ def enable_cross_chain_sync(source_chain, target_chains):
             'status': 'synchronized'
         }
     }
+
+# Chainlink USD aggregator proxies on Ethereum mainnet
+PRICE_FEED_ADDRESSES = {
+    'ETH/USD': '0x5f4eC3Df9cbd43714FE2740f5E3616155c5b8419',
+    'BTC/USD': '0xF4030086522a5bEEa4988F8cA5B36dbC97BeE88c',
+    'MATIC/USD': '0x7bAC85A8a13A4BcD8abb3eB7d6b4d632c5a57676',
+    'LINK/USD': '0x2c1d072e956AFFC0D435Cb7AC38EF18d24d9127c',
+    'AVAX/USD': '0xFF3EEb22B5E3dE6e705b44749C2559d704923FD7'
+}
+PRICE_FEED_RPC_URL = RPC_URLS['ethereum']
+PRICE_FEED_DECIMALS = 8  # USD feeds report 8 decimals
+LATEST_ROUND_DATA_SELECTOR = '0xfeaf968c'  # latestRoundData()
+ROUND_DATA_SIZE = 5 * 32  # (roundId, answer, startedAt, updatedAt, answeredInRound)
+
+# Feeds also update on price deviation, so a cached round is only trusted
+# for a short window rather than the full (often hourly) heartbeat
+PRICE_CACHE_TTL = 30  # seconds
+_PRICE_CACHE = {}  # (pair, rpc_url) -> (fetched_at, result)
+_PRICE_CACHE_LOCK = threading.Lock()
+_PRICE_FETCH_LOCKS = {}
+
+class ChainlinkPriceFeeds:
+    """Chainlink price feed reader over Ethereum JSON-RPC"""
+    
+    def __init__(self, rpc_url=PRICE_FEED_RPC_URL):
+        self.rpc_url = rpc_url
+        self.price_feeds = PRICE_FEED_ADDRESSES
+    
+    def _round_data_call(self, request_id, pair):
+        """Build the eth_call request reading latestRoundData() from a feed"""
+        return {
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'method': 'eth_call',
+            'params': [{'to': self.price_feeds[pair], 'data': LATEST_ROUND_DATA_SELECTOR}, 'latest']
+        }
+    
+    def _decode_round_data(self, pair, result):
+        """
+        Decode a latestRoundData() return value into price data
+        
+        Raises:
+            ValueError: If the result is not five ABI words or the answer is not positive
+        """
+        raw = bytes.fromhex(result[2:])
+        # An empty result means a wrong network, a non-contract address or a revert
+        if len(raw) < ROUND_DATA_SIZE:
+            raise ValueError(f'Short latestRoundData result for {pair}: {len(raw)} bytes')
+        answer = int.from_bytes(raw[32:64], 'big', signed=True)
+        if answer <= 0:
+            raise ValueError(f'Invalid {pair} price feed answer: {answer}')
+        price = Decimal(answer).scaleb(-PRICE_FEED_DECIMALS)
+        return {
+            'pair': pair,
+            'price': float(price),
+            'price_decimal': str(price),
+            'round_id': int.from_bytes(raw[0:32], 'big'),
+            'updated_at': int.from_bytes(raw[96:128], 'big'),
+            'feed_address': self.price_feeds[pair],
+            'source': 'chainlink_price_feeds'
+        }
+    
+    def _cached_price(self, pair, max_age_s):
+        """Return a cached price result no older than max_age_s, or None"""
+        with _PRICE_CACHE_LOCK:
+            entry = _PRICE_CACHE.get((pair, self.rpc_url))
+        if entry and time.monotonic() - entry[0] < max_age_s:
+            return entry[1]
+        return None
+    
+    def _cache_price(self, pair, result):
+        """Cache a successful price result"""
+        if result.get('success'):
+            with _PRICE_CACHE_LOCK:
+                _PRICE_CACHE[(pair, self.rpc_url)] = (time.monotonic(), result)
+    
+    def get_latest_price(self, pair='ETH/USD', max_age_s=PRICE_CACHE_TTL):
+        """
+        Get the latest price for an asset pair from its Chainlink feed
+        
+        Results are cached per (pair, RPC endpoint). Concurrent misses for the
+        same pair wait on one feed read instead of each calling the RPC.
+        
+        Args:
+            pair: Asset pair, e.g. 'ETH/USD'
+            max_age_s: Oldest cached result to accept, in seconds (0 forces a read)
+        
+        Returns:
+            dict: Price result with success flag
+        """
+        # Reject unknown pairs before they get a fetch lock, so caller-supplied
+        # pairs can't grow the lock table
+        if pair not in self.price_feeds:
+            return {
+                'success': False,
+                'error': f'Unsupported price pair: {pair}'
+            }
+        
+        cached = self._cached_price(pair, max_age_s)
+        if cached:
+            return cached
+        
+        with _PRICE_CACHE_LOCK:
+            fetch_lock = _PRICE_FETCH_LOCKS.setdefault((pair, self.rpc_url), threading.Lock())
+        
+        with fetch_lock:
+            # Another thread may have read the feed while we waited
+            cached = self._cached_price(pair, max_age_s)
+            if cached:
+                return cached
+            
+            result = self._fetch_latest_price(pair)
+            self._cache_price(pair, result)
+            return result
+    
+    def _fetch_latest_price(self, pair):
+        """Read the latest round for an asset pair from its Chainlink feed"""
+        try:
+            response = _rpc_post(self.rpc_url, self._round_data_call(1, pair))
+            
+            if response.status_code == 200:
+                reply = _loads(response.content)
+                if 'result' not in reply:
+                    return {
+                        'success': False,
+                        'error': f"Price feed call failed: {reply.get('error')}"
+                    }
+                
+                price_data = self._decode_round_data(pair, reply['result'])
+                return {
                     'success': True,
                     'data': price_data
                 }
@@ -351,17 +549,60 @@ def enable_cross_chain_sync(source_chain, target_chains):
                 'error': f'Chainlink price feed error: {str(e)}'
             }
     
-    def get_multiple_prices(self, pairs=['ETH/USD', 'BTC/USD', 'MATIC/USD']):
-        """Get prices for multiple asset pairs"""
-        results = {}
+    def get_multiple_prices(self, pairs=['ETH/USD', 'BTC/USD', 'MATIC/USD'], batch_size=100):
+        """
+        Get prices for multiple asset pairs
         
+        Pairs with a fresh cached price are served from the cache. The rest
+        are read with JSON-RPC batch requests of up to batch_size calls, so N
+        pairs cost one round trip instead of N. Pairs the batch could not
+        answer fall back to individual get_latest_price calls.
+        """
+        batched = {}
         for pair in pairs:
-            results[pair] = self.get_latest_price(pair)
+            cached = self._cached_price(pair, PRICE_CACHE_TTL)
+            if cached:
+                batched[pair] = cached
+        supported = [pair for pair in pairs if pair in self.price_feeds and pair not in batched]
+        
+        for start in range(0, len(supported), batch_size):
+            chunk = supported[start:start + batch_size]
+            replies = {}
+            try:
+                response = _rpc_post(
+                    self.rpc_url,
+                    [self._round_data_call(i, pair) for i, pair in enumerate(chunk)]
+                )
+                if response.status_code == 200:
+                    batch_reply = _loads(response.content)
+                    # Providers without batch support answer with a single error object
+                    if isinstance(batch_reply, list):
+                        replies = {reply.get('id'): reply for reply in batch_reply}
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"Batched price feed request failed: {str(e)}")
+            
+            for i, pair in enumerate(chunk):
+                reply = replies.get(i)
+                if not reply or 'result' not in reply:
+                    continue
+                try:
+                    price_data = self._decode_round_data(pair, reply['result'])
+                except (TypeError, ValueError) as e:
+                    # Leave the pair for the individual read below
+                    logger.warning(f"Batched price feed result unusable: {str(e)}")
+                    continue
+                batched[pair] = {
+                    'success': True,
+                    'data': price_data
+                }
+                self._cache_price(pair, batched[pair])
+        
+        results = {pair: batched.get(pair) or self.get_latest_price(pair) for pair in pairs}
         
         return {
             'success': True,
             'data': results,
-            'timestamp': int(requests.get('http://worldtimeapi.org/api/timezone/UTC').json()['unixtime'])
+            'timestamp': int(time.time())
         }
     
     def calculate_nft_value_in_usd(self, nft_price_eth, eth_usd_price=None):
@@ -372,15 +613,19 @@ def enable_cross_chain_sync(source_chain, target_chains):
                 if not eth_price_data['success']:
                     return eth_price_data
                 eth_usd_price = eth_price_data['data']['price']
+                eth_usd_exact = Decimal(eth_price_data['data']['price_decimal'])
+            else:
+                eth_usd_exact = Decimal(str(eth_usd_price))
             
-            usd_value = float(nft_price_eth) * eth_usd_price
+            # Multiply in Decimal so rounding to cents is exact
+            usd_value = Decimal(str(nft_price_eth)) * eth_usd_exact
             
             return {
                 'success': True,
                 'data': {
                     'nft_price_eth': nft_price_eth,
                     'eth_usd_price': eth_usd_price,
-                    'nft_value_usd': round(usd_value, 2)
+                    'nft_value_usd': float(round(usd_value, 2))
                 }
             }
             
@@ -390,6 +635,22 @@ def enable_cross_chain_sync(source_chain, target_chains):
                 'error': f'USD calculation error: {str(e)}'
             }
 
+# Values each NFT trait can take, in the order traits are drawn
+TRAIT_CHOICES = {
+    'background': ('Blue', 'Green', 'Red', 'Purple', 'Orange', 'Yellow'),
+    'body': ('Robot', 'Alien', 'Human', 'Zombie', 'Angel'),
+    'eyes': ('Normal', 'Laser', 'Glowing', 'Closed', 'Winking'),
+    'accessory': ('Hat', 'Sunglasses', 'Necklace', 'None', 'Crown')
+}
+
+# Share of each trait value, used to rank how rare a trait combination is
+RARITY_WEIGHTS = {
+    'background': {'Blue': 0.2, 'Green': 0.15, 'Red': 0.25, 'Purple': 0.1, 'Orange': 0.2, 'Yellow': 0.1},
+    'body': {'Robot': 0.1, 'Alien': 0.15, 'Human': 0.3, 'Zombie': 0.2, 'Angel': 0.25},
+    'eyes': {'Normal': 0.3, 'Laser': 0.1, 'Glowing': 0.15, 'Closed': 0.25, 'Winking': 0.2},
+    'accessory': {'Hat': 0.2, 'Sunglasses': 0.15, 'Necklace': 0.1, 'None': 0.4, 'Crown': 0.15}
+}
+
 class ChainlinkVRF:
     """Chainlink VRF integration for provably fair randomness in NFT features"""
     
@@ -400,25 +661,17 @@ class ChainlinkVRF:
     def generate_random_traits(self, token_id, seed=None):
         """Generate random traits for NFTs using Chainlink VRF concept"""
         try:
-            import hashlib
-            import random
-            
             # Simulate VRF randomness (in production, this would use actual VRF)
             if seed is None:
                 seed = f"{token_id}_{self.key_hash}"
             
-            # Create deterministic randomness based on token ID and VRF
-            hash_object = hashlib.sha256(seed.encode())
-            random_seed = int(hash_object.hexdigest(), 16)
-            random.seed(random_seed)
+            # Create deterministic randomness based on token ID and VRF; a
+            # private generator leaves the global random state alone
+            digest = hashlib.sha256(seed.encode()).digest()
+            rng = random.Random(int.from_bytes(digest, 'big'))
             
-            traits = {
-                'background': random.choice(['Blue', 'Green', 'Red', 'Purple', 'Orange', 'Yellow']),
-                'body': random.choice(['Robot', 'Alien', 'Human', 'Zombie', 'Angel']),
-                'eyes': random.choice(['Normal', 'Laser', 'Glowing', 'Closed', 'Winking']),
-                'accessory': random.choice(['Hat', 'Sunglasses', 'Necklace', 'None', 'Crown']),
-                'rarity_score': random.randint(1, 100)
-            }
+            traits = {trait_type: rng.choice(choices) for trait_type, choices in TRAIT_CHOICES.items()}
+            traits['rarity_score'] = rng.randint(1, 100)
             
             return {
                 'success': True,
@@ -436,19 +689,17 @@ class ChainlinkVRF:
                 'error': f'VRF trait generation error: {str(e)}'
             }
     
+    def generate_random_traits_batch(self, token_ids):
+        """Generate random traits for several NFTs, e.g. for a whole drop"""
+        return [self.generate_random_traits(token_id) for token_id in token_ids]
+    
     def _calculate_rarity_rank(self, traits):
         """Calculate rarity rank based on trait combinations"""
-        rarity_weights = {
-            'background': {'Blue': 0.2, 'Green': 0.15, 'Red': 0.25, 'Purple': 0.1, 'Orange': 0.2, 'Yellow': 0.1},
-            'body': {'Robot': 0.1, 'Alien': 0.15, 'Human': 0.3, 'Zombie': 0.2, 'Angel': 0.25},
-            'eyes': {'Normal': 0.3, 'Laser': 0.1, 'Glowing': 0.15, 'Closed': 0.25, 'Winking': 0.2},
-            'accessory': {'Hat': 0.2, 'Sunglasses': 0.15, 'Necklace': 0.1, 'None': 0.4, 'Crown': 0.15}
-        }
-        
-        total_rarity = 1.0
-        for trait_type, trait_value in traits.items():
-            if trait_type in rarity_weights and trait_value in rarity_weights[trait_type]:
-                total_rarity *= rarity_weights[trait_type][trait_value]
+        total_rarity = math.prod(
+            RARITY_WEIGHTS[trait_type][trait_value]
+            for trait_type, trait_value in traits.items()
+            if trait_value in RARITY_WEIGHTS.get(trait_type, ())
+        )
         
         # Convert to rank (lower number = rarer)
         rarity_rank = int(1 / total_rarity)
@@ -470,6 +721,7 @@ class ChainlinkStateChanging:
                 'encoded_cron_spec': '0 * * * *',  # Every hour
                 'upkeep_contract': callback_address,
                 'gas_limit': 500000,
+                # Keep json.dumps' default separators: keepers compare these bytes
                 'check_data': json.dumps({
                     'asset_pair': asset_pair,
                     'threshold': price_threshold,
@@ -479,7 +731,7 @@ class ChainlinkStateChanging:
             
             return {
                 'success': True,
-                'automation_id': f"price_alert_{int(time.time())}",
+                'automation_id': f"price_alert_{secrets.token_hex(8)}",
                 'config': automation_config,
                 'message': f'Price alert automation created for {asset_pair} at threshold ${price_threshold}'
             }
@@ -531,7 +783,7 @@ class ChainlinkStateChanging:
                 'ccip_router': '0x80226fc0Ee2b096224EeAc085Bb9a8cba1146f7D'
             }
             
-            sync_id = f"ccip_sync_{int(time.time())}"
+            sync_id = f"ccip_sync_{secrets.token_hex(8)}"
             
             return {
                 'success': True,
@@ -546,35 +798,44 @@ class ChainlinkStateChanging:
                 'error': str(e)
             }
 
+@lru_cache(maxsize=1)
+def _get_price_feeds():
+    """Get the shared ChainlinkPriceFeeds instance"""
+    return ChainlinkPriceFeeds()
+
+@lru_cache(maxsize=1)
+def _get_vrf():
+    """Get the shared ChainlinkVRF instance"""
+    return ChainlinkVRF()
+
+@lru_cache(maxsize=1)
+def _get_state_ops():
+    """Get the shared ChainlinkStateChanging instance"""
+    return ChainlinkStateChanging()
+
 def get_chainlink_price_data(pair='ETH/USD'):
     """Utility function to get Chainlink price data"""
-    price_feeds = ChainlinkPriceFeeds()
-    return price_feeds.get_latest_price(pair)
+    return _get_price_feeds().get_latest_price(pair)
 
 def generate_nft_traits_with_vrf(token_id):
     """Utility function to generate NFT traits using VRF"""
-    vrf = ChainlinkVRF()
-    return vrf.generate_random_traits(token_id)
+    return _get_vrf().generate_random_traits(token_id)
 
 def calculate_nft_usd_value(nft_price_eth):
     """Utility function to calculate NFT USD value"""
-    price_feeds = ChainlinkPriceFeeds()
-    return price_feeds.calculate_nft_value_in_usd(nft_price_eth)
+    return _get_price_feeds().calculate_nft_value_in_usd(nft_price_eth)
 
 def create_price_automation(price_threshold, asset_pair, callback_address):
     """Create Chainlink Automation for price monitoring"""
-    state_ops = ChainlinkStateChanging()
-    return state_ops.create_price_alert_automation(price_threshold, asset_pair, callback_address)
+    return _get_state_ops().create_price_alert_automation(price_threshold, asset_pair, callback_address)
 
 def setup_dynamic_nft_pricing(nft_contract, collection_id):
     """Setup dynamic NFT pricing using Chainlink feeds"""
-    state_ops = ChainlinkStateChanging()
-    return state_ops.create_dynamic_nft_pricing(nft_contract, collection_id)
+    return _get_state_ops().create_dynamic_nft_pricing(nft_contract, collection_id)
 
 def enable_cross_chain_sync(source_chain, target_chains):
     """Enable cross-chain price synchronization"""
-    state_ops = ChainlinkStateChanging()
-    return state_ops.create_cross_chain_price_sync(source_chain, target_chains)
+    return _get_state_ops().create_cross_chain_price_sync(source_chain, target_chains)
 
 # Main interface functions for Lambda handler
 def get_chainlink_price(asset_pair, network='ethereum'):
@@ -591,8 +852,7 @@ def get_chainlink_price(asset_pair, network='ethereum'):
 def request_vrf_randomness(consumer_address=None, key_hash=None, fee=None, seed=None):
     """Main function for requesting VRF randomness"""
     try:
-        vrf = ChainlinkVRF()
-        return vrf.request_randomness(consumer_address, key_hash, fee, seed)
+        return _get_vrf().request_randomness(consumer_address, key_hash, fee, seed)
     except Exception as e:
         logger.error(f"Error requesting VRF randomness: {str(e)}")
         return {
@@ -603,8 +863,7 @@ def request_vrf_randomness(consumer_address=None, key_hash=None, fee=None, seed=
 def fulfill_randomness_callback(request_id, randomness):
     """Main function for VRF randomness fulfillment"""
     try:
-        vrf = ChainlinkVRF()
-        return vrf.fulfill_randomness(request_id, randomness)
+        return _get_vrf().fulfill_randomness(request_id, randomness)
     except Exception as e:
         logger.error(f"Error fulfilling VRF randomness: {str(e)}")
         return {
@@ -612,26 +871,25 @@ def fulfill_randomness_callback(request_id, randomness):
             'error': str(e)
         }
 
+@lru_cache(maxsize=1)
 def get_supported_price_feeds():
-    """Get list of supported Chainlink price feeds"""
-    try:
-        price_feeds = ChainlinkPriceFeeds()
-        feeds_list = []
-        for pair, address in price_feeds.price_feeds.items():
-            feeds_list.append({
-                'pair': pair,
-                'feed_address': address,
-                'description': f'Chainlink price feed for {pair}'
-            })
-        
-        return {
-            'success': True,
-            'feeds': feeds_list,
-            'total_feeds': len(feeds_list)
-        }
-    except Exception as e:
-        logger.error(f"Error getting supported feeds: {str(e)}")
-        return {
-            'success': False,
-            'error': str(e)
+    """
+    Get list of supported Chainlink price feeds
+    
+    The feed table is static, so the response is built once and shared;
+    callers must treat it as read-only.
+    """
+    feeds_list = [
+        {
+            'pair': pair,
+            'feed_address': address,
+            'description': f'Chainlink price feed for {pair}'
         }
+        for pair, address in PRICE_FEED_ADDRESSES.items()
+    ]
+    
+    return {
+        'success': True,
+        'feeds': feeds_list,
+        'total_feeds': len(feeds_list)
+    }
@@ -63,7 +63,7 @@ class EnhancedBedrockAPI:
             resource = event.get('resource', '/')
             
             # Extract common parameters
-            session_id = body.get('sessionId', str(uuid.uuid4()))
+            session_id = body.get('sessionId') or str(uuid.uuid4())
             user_id = body.get('userId')
             message = body.get('message', '')
             
@@ -6,12 +6,14 @@ from DynamoDB, enabling persistent information across conversations.
 """
 
 import boto3
+from botocore.exceptions import ClientError
 import os
 import json
 import uuid
 import time
 from datetime import datetime, timedelta
 import logging
+from functools import lru_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +22,39 @@ logger = logging.getLogger("session_manager")
 # Default table name from environment variable
 DEFAULT_SESSION_TABLE = os.environ.get('BEDROCK_SESSIONS_TABLE', 'NFTBedrockSessions')
 
+@lru_cache(maxsize=1)
+def _get_session_table():
+    """
+    Get the DynamoDB session table, creating the resource only once
+    
+    The handle is kept for the lifetime of the Lambda execution environment
+    so warm invocations reuse the same connection pool.
+    
+    Returns:
+        DynamoDB Table resource, or None when no AWS region is configured
+    """
+    # Get region name from environment
+    region_name = os.environ.get('AWS_REGION')
+    
+    # For local testing without AWS credentials
+    if 'AWS_ENDPOINT_URL' in os.environ:
+        # Use local DynamoDB
+        dynamodb = boto3.resource(
+            'dynamodb', 
+            endpoint_url=os.environ['AWS_ENDPOINT_URL'],
+            region_name=region_name or 'us-east-1',
+            aws_access_key_id='test',
+            aws_secret_access_key='test'
+        )
+    elif not region_name:
+        # For testing without actual DynamoDB
+        return None
+    else:
+        # Use actual DynamoDB in AWS
+        dynamodb = boto3.resource('dynamodb', region_name=region_name)
+        
+    return dynamodb.Table(DEFAULT_SESSION_TABLE)
+
 def store_user_data(session_id, user_id=None, data=None):
     """
     Store user data in DynamoDB session table
@@ -41,20 +76,9 @@ def store_user_data(session_id, user_id=None, data=None):
         return False
         
     try:
-        # Get region name from environment
-        region_name = os.environ.get('AWS_REGION')
+        table = _get_session_table()
         
-        # For local testing without AWS credentials
-        if 'AWS_ENDPOINT_URL' in os.environ:
-            # Use local DynamoDB
-            dynamodb = boto3.resource(
-                'dynamodb', 
-                endpoint_url=os.environ['AWS_ENDPOINT_URL'],
-                region_name=region_name or 'us-east-1',
-                aws_access_key_id='test',
-                aws_secret_access_key='test'
-            )
-        elif not region_name:
+        if table is None:
             # For testing without actual DynamoDB
             logger.warning("No AWS region specified, using mock storage")
             # Store in memory for testing
@@ -72,11 +96,6 @@ def store_user_data(session_id, user_id=None, data=None):
             }
             logger.info(f"Stored session data in mock storage for session {session_id}")
             return True
-        else:
-            # Use actual DynamoDB in AWS
-            dynamodb = boto3.resource('dynamodb', region_name=region_name)
-            
-        table = dynamodb.Table(DEFAULT_SESSION_TABLE)
         
         # Current timestamp
         current_time = int(time.time())
@@ -121,20 +140,9 @@ def get_user_data(session_id, user_id=None):
         return None
         
     try:
-        # Get region name from environment
-        region_name = os.environ.get('AWS_REGION')
+        table = _get_session_table()
         
-        # For local testing without AWS credentials
-        if 'AWS_ENDPOINT_URL' in os.environ:
-            # Use local DynamoDB
-            dynamodb = boto3.resource(
-                'dynamodb', 
-                endpoint_url=os.environ['AWS_ENDPOINT_URL'],
-                region_name=region_name or 'us-east-1',
-                aws_access_key_id='test',
-                aws_secret_access_key='test'
-            )
-        elif not region_name:
+        if table is None:
             # For testing without actual DynamoDB
             logger.warning("No AWS region specified, using mock storage")
             # Check in-memory data for testing
@@ -161,10 +169,6 @@ def get_user_data(session_id, user_id=None):
             # Return the data
             return item.get('data', {})
         else:
-            # Use actual DynamoDB in AWS
-            dynamodb = boto3.resource('dynamodb', region_name=region_name)
-            table = dynamodb.Table(DEFAULT_SESSION_TABLE)
-            
             # Get session from DynamoDB
             response = table.get_item(
                 Key={'session_id': session_id}
@@ -194,6 +198,100 @@ def get_user_data(session_id, user_id=None):
         logger.error(f"Error retrieving session data: {str(e)}")
         return None
 
+def append_user_data_list(session_id, field, item, user_id=None):
+    """
+    Append an item to a list field of the user's session data
+    
+    Uses a DynamoDB list_append update so only the new item is sent,
+    rather than reading and rewriting the whole session blob.
+    
+    Args:
+        session_id: The Bedrock agent session ID
+        field: Name of the list field in the session data
+        item: Item to append
+        user_id: Optional user identifier
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not session_id:
+        logger.error("Session ID is required")
+        return False
+        
+    try:
+        table = _get_session_table()
+        
+        if table is None:
+            # For testing without actual DynamoDB
+            existing_data = get_user_data(session_id, user_id) or {}
+            existing_data.setdefault(field, []).append(item)
+            return store_user_data(session_id, user_id, existing_data)
+            
+        # Current timestamp
+        current_time = int(time.time())
+        
+        update_expression = (
+            "SET #data.#field = list_append(if_not_exists(#data.#field, :empty), :item), "
+            "#timestamp = :timestamp, #expiration = :expiration"
+        )
+        expression_values = {
+            ':empty': [],
+            ':item': [item],
+            ':timestamp': current_time,
+            ':expiration': current_time + (30 * 24 * 60 * 60)
+        }
+        # Only append to a live session owned by the same user, matching the
+        # checks get_user_data applies on read
+        condition_expression = "(attribute_not_exists(#expiration) OR #expiration >= :now)"
+        condition_values = {':now': current_time}
+        if user_id:
+            update_expression += ", user_id = :user_id"
+            condition_expression += " AND (attribute_not_exists(user_id) OR user_id = :user_id)"
+            condition_values[':user_id'] = user_id
+        expression_values.update(condition_values)
+            
+        append_kwargs = {
+            'Key': {'session_id': session_id},
+            'UpdateExpression': update_expression,
+            'ConditionExpression': condition_expression,
+            'ExpressionAttributeNames': {
+                '#data': 'data',
+                '#field': field,
+                '#timestamp': 'timestamp',
+                '#expiration': 'expiration'
+            },
+            'ExpressionAttributeValues': expression_values
+        }
+        try:
+            try:
+                table.update_item(**append_kwargs)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ValidationException':
+                    raise
+                # The session has no data map yet. Create an empty one without
+                # touching any map a concurrent writer may have just added, then
+                # retry the append so no other fields are overwritten
+                table.update_item(
+                    Key={'session_id': session_id},
+                    UpdateExpression="SET #data = if_not_exists(#data, :emptymap)",
+                    ConditionExpression=condition_expression,
+                    ExpressionAttributeNames={'#data': 'data', '#expiration': 'expiration'},
+                    ExpressionAttributeValues={':emptymap': {}, **condition_values}
+                )
+                table.update_item(**append_kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            logger.warning(f"Session {session_id} is expired or belongs to another user")
+            return False
+            
+        logger.info(f"Appended to {field} for session {session_id}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error appending session data: {str(e)}")
+        return False
+
 def store_wallet_address(session_id, wallet_address, user_id=None):
     """
     Store wallet address in the user's session
@@ -232,6 +330,45 @@ def get_wallet_address(session_id, user_id=None):
     # Return wallet address if found
     return user_data.get('wallet_address') if user_data else None
 
+def update_wallet_session(session_id, wallet_address, user_id=None, updates=None):
+    """
+    Store the wallet address and merge updates into the session data together
+    
+    Does one read and one write, where store_wallet_address followed by
+    store_user_data would each read and write the session.
+    
+    Args:
+        session_id: The Bedrock agent session ID
+        wallet_address: Ethereum wallet address
+        user_id: Optional user identifier
+        updates: Session data fields to set; fields set to None are removed
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    data = get_user_data(session_id, user_id) or {}
+    data['wallet_address'] = wallet_address
+    for field, value in (updates or {}).items():
+        if value is None:
+            data.pop(field, None)
+        else:
+            data[field] = value
+    return store_user_data(session_id, user_id, data)
+
+def get_session(session_id, user_id=None):
+    """
+    Get the wallet address and user data for a session in one lookup
+    
+    Args:
+        session_id: The Bedrock agent session ID
+        user_id: Optional user identifier
+        
+    Returns:
+        tuple: (wallet_address, data), each None if not found
+    """
+    user_data = get_user_data(session_id, user_id)
+    return (user_data.get('wallet_address') if user_data else None), user_data
+
 def create_dynamodb_table(table_name=DEFAULT_SESSION_TABLE, region=None):
     """
     Create DynamoDB table for session storage if it doesn't exist